@@ -1,5 +1,7 @@
 import os
+import re
 import logging
+import secrets
 from pathlib import Path
 from dataclasses import dataclass
 from dotenv import load_dotenv
@@ -50,6 +52,21 @@ def get_whitelist(key: str) -> tuple[int, ...]:
 class TelegramConfig:
     bot_token: str
     whitelist: tuple[int, ...]
+    global_rate: int
+    chat_rate: int
+    mode: str
+    drop_pending_updates: bool
+
+
+@dataclass(frozen=True)
+class WebhookConfig:
+    url: str
+    listen: str
+    port: int
+    path: str
+    secret: str
+    cert: str
+    key: str
 
 
 @dataclass(frozen=True)
@@ -59,6 +76,35 @@ class ProxmoxConfig:
     token_name: str
     token_value: str
     port: int
+    request_timeout: int
+    breaker_threshold: int
+    breaker_reset: int
+    task_timeout: int
+    bulk_node_concurrency: int
+    node_concurrency: int
+    cluster_concurrency: int
+    inventory_ttl: int
+    inventory_max_stale: int
+
+
+@dataclass(frozen=True)
+class TerminalConfig:
+    exec_timeout: int
+    console_timeout: int
+    max_output: int
+    buffer_entries: int
+    buffer_bytes: int
+    stream_interval: int
+
+
+@dataclass(frozen=True)
+class HistoryConfig:
+    sample_interval: int
+
+
+@dataclass(frozen=True)
+class StatusConfig:
+    disk_timeout: int
 
 
 @dataclass(frozen=True)
@@ -67,10 +113,45 @@ class AlertsConfig:
     cpu_usage_threshold: int
     ram_usage_threshold: int
     check_interval: int
+    sustain: int
+    hysteresis: int
+    update_interval: int
+    guest_cpu_threshold: int
+    guest_mem_threshold: int
+    guest_disk_threshold: int
+    guest_overrides: str
+    digest_threshold: int
 
 
 TELEGRAM = TelegramConfig(
-    bot_token=get_env("BOT_TOKEN", required=True), whitelist=get_whitelist("WHITELIST")
+    bot_token=get_env("BOT_TOKEN", required=True),
+    whitelist=get_whitelist("WHITELIST"),
+    global_rate=max(1, get_env_int("TELEGRAM_GLOBAL_RATE", 25)),
+    chat_rate=max(1, get_env_int("TELEGRAM_CHAT_RATE", 20)),
+    mode=get_env("BOT_MODE", default="polling").lower(),
+    drop_pending_updates=get_env_int("DROP_PENDING_UPDATES", 1) != 0,
+)
+
+if TELEGRAM.mode not in ("polling", "webhook"):
+    raise ValueError(
+        f"Критическая ошибка: BOT_MODE должен быть polling или webhook, а не {TELEGRAM.mode!r}"
+    )
+
+_webhook_secret = get_env("WEBHOOK_SECRET")
+if _webhook_secret and not re.fullmatch(r"[A-Za-z0-9_-]{1,256}", _webhook_secret):
+    raise ValueError(
+        "Критическая ошибка: WEBHOOK_SECRET может содержать только A-Z, a-z, 0-9, _ и - (до 256 символов)"
+    )
+
+WEBHOOK = WebhookConfig(
+    url=get_env("WEBHOOK_URL", required=TELEGRAM.mode == "webhook").rstrip("/"),
+    listen=get_env("WEBHOOK_LISTEN", default="127.0.0.1"),
+    port=get_env_int("WEBHOOK_PORT", 8443),
+    path=get_env("WEBHOOK_PATH", default="telegram").strip("/"),
+    # Без явного секрета генерируется новый при каждом запуске (setWebhook его обновит)
+    secret=_webhook_secret or secrets.token_urlsafe(32),
+    cert=get_env("WEBHOOK_CERT"),
+    key=get_env("WEBHOOK_KEY"),
 )
 
 _proxmox_host = get_env("HOST") or get_env("PROXMOX_HOST", default="localhost")
@@ -85,6 +166,32 @@ PROXMOX = ProxmoxConfig(
     token_name=get_env("PROXMOX_TOKEN_NAME", required=True),
     token_value=get_env("PROXMOX_TOKEN_VALUE", required=True),
     port=get_env_int("PROXMOX_PORT", 8006),
+    request_timeout=get_env_int("PROXMOX_TIMEOUT", 30),
+    breaker_threshold=max(1, get_env_int("PROXMOX_BREAKER_THRESHOLD", 5)),
+    breaker_reset=get_env_int("PROXMOX_BREAKER_RESET", 30),
+    task_timeout=get_env_int("PROXMOX_TASK_TIMEOUT", 120),
+    bulk_node_concurrency=max(1, get_env_int("BULK_NODE_CONCURRENCY", 2)),
+    node_concurrency=max(1, get_env_int("PROXMOX_NODE_CONCURRENCY", 4)),
+    cluster_concurrency=max(1, get_env_int("PROXMOX_CLUSTER_CONCURRENCY", 16)),
+    inventory_ttl=get_env_int("INVENTORY_CACHE_TTL", 15),
+    inventory_max_stale=get_env_int("INVENTORY_CACHE_MAX_STALE", 60),
+)
+
+TERMINAL = TerminalConfig(
+    exec_timeout=get_env_int("TERMINAL_EXEC_TIMEOUT", 60),
+    console_timeout=get_env_int("CONSOLE_TIMEOUT", 30),
+    max_output=get_env_int("TERMINAL_MAX_OUTPUT", 256 * 1024),
+    buffer_entries=max(1, get_env_int("OUTPUT_BUFFER_PER_CHAT", 10)),
+    buffer_bytes=get_env_int("OUTPUT_BUFFER_MAX_BYTES", 8 * 1024 * 1024),
+    stream_interval=max(1, get_env_int("TERMINAL_STREAM_INTERVAL", 2)),
+)
+
+HISTORY = HistoryConfig(
+    sample_interval=max(1, get_env_int("HISTORY_SAMPLE_INTERVAL", 10)),
+)
+
+STATUS = StatusConfig(
+    disk_timeout=max(1, get_env_int("STATUS_DISK_TIMEOUT", 2)),
 )
 
 ALERTS = AlertsConfig(
@@ -92,4 +199,12 @@ ALERTS = AlertsConfig(
     cpu_usage_threshold=get_env_int("CPU_USAGE_THRESHOLD", 80),
     ram_usage_threshold=get_env_int("RAM_USAGE_THRESHOLD", 80),
     check_interval=get_env_int("CHECK_INTERVAL", 300),
+    sustain=get_env_int("ALERT_SUSTAIN", 0),
+    hysteresis=get_env_int("ALERT_HYSTERESIS", 5),
+    update_interval=get_env_int("ALERT_UPDATE_INTERVAL", 600),
+    guest_cpu_threshold=get_env_int("GUEST_CPU_THRESHOLD", 90),
+    guest_mem_threshold=get_env_int("GUEST_MEM_THRESHOLD", 95),
+    guest_disk_threshold=get_env_int("GUEST_DISK_THRESHOLD", 90),
+    guest_overrides=get_env("GUEST_ALERT_OVERRIDES"),
+    digest_threshold=get_env_int("ALERT_DIGEST_THRESHOLD", 3),
 )
@@ -36,16 +36,15 @@ def require_auth(func):
             f"Неавторизованный доступ заблокирован! {user_info} | Запрос: {command}"
         )
 
+        # Через диспетчер: не ждём отправки, а серия попыток склеивается в одну сводку
+        dispatcher = context.bot_data["dispatcher"]
         for admin_id in whitelist:
-            try:
-                await context.bot.send_message(
-                    chat_id=admin_id,
-                    text=f"📋 Лог — неавторизованный доступ\n"
-                    f"Пользователь: {user_info}\n"
-                    f"Запрос: {command}",
-                )
-            except Exception as e:
-                logger.error(f"Ошибка отправки уведомления админу {admin_id}: {e}")
+            dispatcher.notify(
+                admin_id,
+                f"📋 Лог — неавторизованный доступ\n"
+                f"Пользователь: {user_info}\n"
+                f"Запрос: {command}",
+            )
 
         return None
 
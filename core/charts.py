@@ -0,0 +1,43 @@
+import html
+
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+
+def sparkline(values, width: int = 30, low=None, high=None) -> str:
+    """
+    Рисует ряд значений строкой из блочных символов. Длинный ряд сжимается
+    до width столбцов усреднением, шкала — от low до high (по умолчанию min/max).
+    """
+    if not values:
+        return ""
+
+    if len(values) > width:
+        columns = []
+        for i in range(width):
+            chunk = values[i * len(values) // width : (i + 1) * len(values) // width]
+            columns.append(sum(chunk) / len(chunk))
+        values = columns
+
+    low = min(values) if low is None else low
+    high = max(values) if high is None else high
+    span = high - low or 1
+
+    top = len(SPARK_CHARS) - 1
+    return "".join(
+        SPARK_CHARS[min(max(round((v - low) / span * top), 0), top)] for v in values
+    )
+
+
+def format_chart(title: str, values, unit: str, low=None, high=None) -> str:
+    """Заголовок, спарклайн и мин/сред/макс/последнее значение в HTML."""
+    if not values:
+        return f"<b>{html.escape(title)}</b>: нет данных"
+
+    line = sparkline(values, low=low, high=high)
+    avg = sum(values) / len(values)
+    return (
+        f"<b>{html.escape(title)}</b>\n"
+        f"<code>{line}</code>\n"
+        f"мин {min(values):.1f}{unit} · сред {avg:.1f}{unit} · "
+        f"макс {max(values):.1f}{unit} · сейчас {values[-1]:.1f}{unit}"
+    )
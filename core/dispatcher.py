@@ -0,0 +1,196 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+from telegram.error import RetryAfter
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_LIMIT = 4000
+MAX_RETRIES = 3
+
+
+class TokenBucket:
+    """Ведро токенов: rate токенов в секунду, не больше capacity подряд."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                await asyncio.sleep(self.blocked_until - now)
+                continue
+
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def block(self, seconds: float):
+        """
+        Telegram ответил RetryAfter: не выдавать токены ближайшие seconds секунд.
+        Токены не обнуляются — то, что накопится за паузу, можно тратить сразу.
+        """
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class _Job:
+    __slots__ = ("method", "kwargs", "future", "coalesce", "attempts")
+
+    def __init__(self, method, kwargs, future=None, coalesce=False):
+        self.method = method
+        self.kwargs = kwargs
+        self.future = future
+        self.coalesce = coalesce
+        self.attempts = 0
+
+
+class _ChatQueue:
+    def __init__(self, bucket: TokenBucket):
+        self.bucket = bucket
+        self.jobs = deque()
+        self.ready = asyncio.Event()
+        self.worker = None
+
+
+class MessageDispatcher:
+    """
+    Исходящие сообщения бота с учётом лимитов Telegram.
+
+    У каждого чата своя очередь и свой обработчик, поэтому медленный или
+    заблокированный чат не задерживает остальные. Отправка ограничена общим
+    ведром токенов и ведром на чат; RetryAfter приостанавливает только этот чат
+    и повторяет сообщение. Уведомления через notify(), накопившиеся в очереди
+    чата, склеиваются в одну сводку.
+    """
+
+    def __init__(self, bot, global_rate: float, chat_rate: float, chat_burst: int = 3):
+        self.bot = bot
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self._global = TokenBucket(global_rate, global_rate)
+        self._chats = {}
+        self.stats = {"sent": 0, "retried": 0, "failed": 0, "coalesced": 0}
+
+    def submit(self, chat_id, method, **kwargs) -> asyncio.Future:
+        """
+        Ставит вызов метода бота в очередь чата и сразу возвращает future с
+        его результатом (или ошибкой). Ждать future не обязательно: результат
+        можно забрать через add_done_callback.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._enqueue(chat_id, _Job(method, dict(chat_id=chat_id, **kwargs), future))
+        return future
+
+    def notify(self, chat_id, text, **kwargs):
+        """
+        Уведомление без ожидания результата. Если к моменту отправки в очереди
+        чата несколько уведомлений с тем же parse_mode, уходит одна сводка.
+        """
+        self._enqueue(
+            chat_id,
+            _Job(
+                "send_message",
+                dict(chat_id=chat_id, text=text, **kwargs),
+                coalesce=True,
+            ),
+        )
+
+    async def stop(self):
+        for chat in self._chats.values():
+            if chat.worker:
+                chat.worker.cancel()
+        await asyncio.gather(
+            *(c.worker for c in self._chats.values() if c.worker),
+            return_exceptions=True,
+        )
+        self._chats.clear()
+
+    def _enqueue(self, chat_id, job):
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            chat = _ChatQueue(TokenBucket(self.chat_rate, self.chat_burst))
+            self._chats[chat_id] = chat
+        if chat.worker is None or chat.worker.done():
+            chat.worker = asyncio.create_task(self._worker(chat_id, chat))
+
+        chat.jobs.append(job)
+        chat.ready.set()
+
+    def _take(self, chat):
+        job = chat.jobs.popleft()
+        if not job.coalesce:
+            return job
+
+        parse_mode = job.kwargs.get("parse_mode")
+        texts = [job.kwargs["text"]]
+        size = len(texts[0])
+        while chat.jobs:
+            nxt = chat.jobs[0]
+            if not nxt.coalesce or nxt.kwargs.get("parse_mode") != parse_mode:
+                break
+            if size + len(nxt.kwargs["text"]) + 2 > MESSAGE_LIMIT:
+                break
+            chat.jobs.popleft()
+            texts.append(nxt.kwargs["text"])
+            size += len(texts[-1]) + 2
+
+        if len(texts) == 1:
+            return job
+
+        self.stats["coalesced"] += len(texts) - 1
+        kwargs = {k: v for k, v in job.kwargs.items() if k != "reply_parameters"}
+        kwargs["text"] = "\n\n".join(texts)
+        return _Job("send_message", kwargs, coalesce=True)
+
+    async def _worker(self, chat_id, chat):
+        while True:
+            if not chat.jobs:
+                chat.ready.clear()
+                await chat.ready.wait()
+                continue
+
+            job = self._take(chat)
+            await chat.bucket.acquire()
+            await self._global.acquire()
+
+            try:
+                result = await getattr(self.bot, job.method)(**job.kwargs)
+            except RetryAfter as e:
+                job.attempts += 1
+                chat.bucket.block(e.retry_after)
+                if job.attempts <= MAX_RETRIES:
+                    self.stats["retried"] += 1
+                    logger.warning(
+                        f"Лимит Telegram для {chat_id}, повтор через {e.retry_after}с"
+                    )
+                    chat.jobs.appendleft(job)
+                    continue
+                self._fail(chat_id, job, e)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._fail(chat_id, job, e)
+            else:
+                self.stats["sent"] += 1
+                if job.future and not job.future.done():
+                    job.future.set_result(result)
+
+    def _fail(self, chat_id, job, error):
+        self.stats["failed"] += 1
+        if job.future:
+            if not job.future.done():
+                job.future.set_exception(error)
+        else:
+            logger.error(f"❌ Не удалось доставить уведомление в {chat_id}: {error}")
@@ -0,0 +1,170 @@
+import asyncio
+import html
+import logging
+import time
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import BadRequest, RetryAfter, TelegramError
+
+from config import TERMINAL
+from core.output_buffer import output_buffer
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_LIMIT = 4000
+
+
+def cancel_keyboard(process) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(
+        [
+            [
+                InlineKeyboardButton(
+                    "⛔ Прервать", callback_data=f"term_cancel:{process.id}"
+                )
+            ]
+        ]
+    )
+
+
+def exit_note(process) -> str:
+    """Строка о том, чем закончился процесс (пустая при успешном завершении)."""
+    if process.cancelled:
+        return "⛔ Команда прервана."
+    if process.timed_out:
+        return (
+            f"⏳ Превышено время выполнения команды (таймаут {process.timeout} секунд)."
+        )
+    if process.returncode:
+        return f"Код возврата: {process.returncode}"
+    return ""
+
+
+def page_keyboard(entry, page: int) -> InlineKeyboardMarkup:
+    total = len(entry.pages)
+    nav = [
+        InlineKeyboardButton(
+            "◀️", callback_data=f"term_page:{entry.id}:{max(page - 1, 0)}"
+        ),
+        InlineKeyboardButton(f"{page + 1}/{total}", callback_data="term_noop"),
+        InlineKeyboardButton(
+            "▶️", callback_data=f"term_page:{entry.id}:{min(page + 1, total - 1)}"
+        ),
+    ]
+    return InlineKeyboardMarkup(
+        [
+            nav,
+            [
+                InlineKeyboardButton(
+                    "📄 Скачать файлом", callback_data=f"term_file:{entry.id}"
+                )
+            ],
+        ]
+    )
+
+
+def render_page(entry, page: int) -> str:
+    text = f"<pre>{html.escape(entry.page(page) or ' ')}</pre>"
+    if entry.title:
+        text = f"{text}\n{html.escape(entry.title)}"
+    return text
+
+
+def _render_result(text: str, note: str) -> str:
+    body = f"<pre>{html.escape(text or ' ')}</pre>"
+    if note:
+        body = f"{body}\n{html.escape(note)}"
+    return body
+
+
+async def reply_paged(message, text: str, note: str = ""):
+    """
+    Отвечает на message готовым выводом: коротким — одним сообщением,
+    длинным — последней страницей из буфера с кнопками листания.
+    """
+    if len(text) <= MESSAGE_LIMIT:
+        await message.reply_text(_render_result(text, note), parse_mode="HTML")
+        return
+
+    entry = output_buffer.store(message.chat_id, note, text)
+    page = len(entry.pages) - 1
+    await message.reply_text(
+        render_page(entry, page),
+        parse_mode="HTML",
+        reply_markup=page_keyboard(entry, page),
+    )
+
+
+class LiveOutput:
+    """
+    Показывает растущий вывод процесса в одном сообщении Telegram.
+
+    Правки склеиваются и отправляются не чаще раза в TERMINAL_STREAM_INTERVAL
+    секунд (RetryAfter отодвигает следующую правку). Пока команда работает,
+    виден хвост вывода; длинный результат по завершении сохраняется в буфер
+    и листается по страницам без повторного запуска команды.
+    """
+
+    def __init__(self, message, reply_markup=None):
+        self.message = message
+        self.reply_markup = reply_markup
+        self._shown = None
+        self._next_edit_at = 0.0
+
+    async def follow(self, runner: asyncio.Task, output):
+        while not runner.done():
+            await asyncio.wait({runner}, timeout=TERMINAL.stream_interval)
+            if not runner.done() and time.monotonic() >= self._next_edit_at:
+                await self._edit(
+                    self._render_tail(output), self.reply_markup, wait=False
+                )
+
+    async def finish(self, output, note: str = ""):
+        if output.total_chars == 0 or not output.text.strip():
+            await self._edit(
+                html.escape(note or "✅ Команда выполнена (без вывода)"), None
+            )
+            return
+
+        text = output.text
+        if output.truncated:
+            skipped = output.total_chars - len(text)
+            text = f"[первые {skipped} символов не сохранены]\n{text}"
+
+        if len(text) <= MESSAGE_LIMIT:
+            await self._edit(_render_result(text, note), None)
+            return
+
+        entry = output_buffer.store(self.message.chat_id, note, text)
+        page = len(entry.pages) - 1
+        await self._edit(render_page(entry, page), page_keyboard(entry, page))
+
+    def _render_tail(self, output) -> str:
+        text = output.text[-MESSAGE_LIMIT:]
+        prefix = (
+            "... [показан конец вывода]\n" if output.total_chars > len(text) else ""
+        )
+        return f"{html.escape(prefix)}<pre>{html.escape(text or ' ')}</pre>"
+
+    async def _edit(self, text: str, markup, wait: bool = True):
+        state = (text, markup.to_json() if markup else None)
+        if self._shown == state:
+            return
+        for _ in range(2):
+            try:
+                await self.message.edit_text(
+                    text, parse_mode="HTML", reply_markup=markup
+                )
+                self._shown = state
+                return
+            except RetryAfter as e:
+                self._next_edit_at = time.monotonic() + e.retry_after
+                if not wait:
+                    return
+                await asyncio.sleep(e.retry_after)
+            except BadRequest as e:
+                if "not modified" not in str(e).lower():
+                    logger.warning(f"Не удалось обновить вывод команды: {e}")
+                return
+            except TelegramError as e:
+                logger.warning(f"Не удалось обновить вывод команды: {e}")
+                return
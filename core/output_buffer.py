@@ -0,0 +1,85 @@
+import itertools
+import logging
+from collections import OrderedDict
+
+from config import TERMINAL
+
+logger = logging.getLogger(__name__)
+
+_ids = itertools.count(1)
+
+
+class OutputEntry:
+    """Сохранённый вывод команды, разбитый на страницы по границам строк."""
+
+    def __init__(self, chat_id: int, title: str, text: str, page_size: int):
+        self.id = str(next(_ids))
+        self.chat_id = chat_id
+        self.title = title
+        self.text = text
+        self.size = len(text.encode("utf-8"))
+        self.pages = self._split(text, page_size)
+
+    @staticmethod
+    def _split(text: str, page_size: int):
+        pages = []
+        start = 0
+        while start < len(text):
+            end = min(start + page_size, len(text))
+            if end < len(text):
+                newline = text.rfind("\n", start, end)
+                if newline > start:
+                    end = newline + 1
+            pages.append((start, end))
+            start = end
+        return pages or [(0, 0)]
+
+    def page(self, index: int) -> str:
+        start, end = self.pages[index]
+        return self.text[start:end]
+
+
+class OutputBuffer:
+    """
+    Буфер вывода команд для постраничного просмотра без повторного запуска.
+    Хранит не больше max_entries записей на чат и не больше max_bytes всего;
+    при переполнении вытесняются давно не открывавшиеся записи (LRU).
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, page_size: int = 4000):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.page_size = page_size
+        self.total_bytes = 0
+        self.evicted = 0
+        self._entries = OrderedDict()
+
+    def store(self, chat_id: int, title: str, text: str) -> OutputEntry:
+        entry = OutputEntry(chat_id, title, text, self.page_size)
+        self._entries[entry.id] = entry
+        self.total_bytes += entry.size
+
+        chat_entries = [e for e in self._entries.values() if e.chat_id == chat_id]
+        for old in chat_entries[: max(len(chat_entries) - self.max_entries, 0)]:
+            self._evict(old.id)
+
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            self._evict(next(iter(self._entries)))
+
+        return entry
+
+    def get(self, chat_id: int, entry_id: str):
+        entry = self._entries.get(entry_id)
+        if entry is None or entry.chat_id != chat_id:
+            return None
+        self._entries.move_to_end(entry_id)
+        return entry
+
+    def _evict(self, entry_id: str):
+        entry = self._entries.pop(entry_id)
+        self.total_bytes -= entry.size
+        self.evicted += 1
+        logger.debug(f"Вывод {entry_id} ({entry.size} байт) вытеснен из буфера")
+
+
+output_buffer = OutputBuffer(TERMINAL.buffer_entries, TERMINAL.buffer_bytes)
@@ -0,0 +1,114 @@
+import asyncio
+import codecs
+import itertools
+import logging
+import os
+import signal
+
+logger = logging.getLogger(__name__)
+
+_ids = itertools.count(1)
+_running = {}
+
+
+class StreamedOutput:
+    """Вывод процесса, накапливаемый по мере чтения. Хранит не больше max_chars последних символов."""
+
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self.text = ""
+        self.total_chars = 0
+        self.version = 0
+
+    def append(self, chunk: str):
+        if not chunk:
+            return
+        self.text += chunk
+        self.total_chars += len(chunk)
+        if len(self.text) > self.max_chars:
+            self.text = self.text[-self.max_chars :]
+        self.version += 1
+
+    @property
+    def truncated(self) -> bool:
+        return self.total_chars > len(self.text)
+
+
+class StreamingProcess:
+    """
+    Подпроцесс на asyncio, вывод которого (stdout и stderr вперемешку) читается
+    порциями по мере появления. Процесс можно прервать по id через cancel_process,
+    по таймауту он убивается вместе со всей группой процессов.
+    """
+
+    def __init__(self, args, timeout: int, max_output: int):
+        self.id = str(next(_ids))
+        self.args = args
+        self.timeout = timeout
+        self.output = StreamedOutput(max_output)
+        self.returncode = None
+        self.timed_out = False
+        self.cancelled = False
+        self._process = None
+
+    async def run(self):
+        self._process = await asyncio.create_subprocess_exec(
+            *self.args,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True,
+        )
+        _running[self.id] = self
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(
+                    self._pump(self._process.stdout),
+                    self._pump(self._process.stderr),
+                    self._process.wait(),
+                ),
+                timeout=self.timeout,
+            )
+        except asyncio.TimeoutError:
+            self.timed_out = True
+            self.kill()
+            await self._process.wait()
+        except asyncio.CancelledError:
+            self.kill()
+            raise
+        finally:
+            _running.pop(self.id, None)
+
+        self.returncode = self._process.returncode
+        return self
+
+    async def _pump(self, stream):
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        while True:
+            chunk = await stream.read(4096)
+            if not chunk:
+                self.output.append(decoder.decode(b"", final=True))
+                return
+            self.output.append(decoder.decode(chunk))
+
+    def kill(self):
+        if self._process is None or self._process.returncode is not None:
+            return
+        try:
+            os.killpg(self._process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    def cancel(self):
+        self.cancelled = True
+        self.kill()
+
+
+def cancel_process(process_id: str) -> bool:
+    """Прерывает запущенный процесс. Возвращает False, если он уже завершился."""
+    process = _running.get(process_id)
+    if process is None:
+        return False
+    logger.info(f"Прерываю процесс {process_id}: {process.args}")
+    process.cancel()
+    return True
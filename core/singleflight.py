@@ -0,0 +1,58 @@
+import asyncio
+import logging
+from functools import wraps
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Объединение одинаковых одновременных запросов: пока загрузка по ключу
+    выполняется, остальные вызовы с тем же ключом ждут её результат (или
+    ошибку), а не запускают свою. Счётчики по операциям показываются в /status.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.stats = {}
+
+    async def do(self, operation: str, key: tuple, func, *args, **kwargs):
+        stats = self.stats.setdefault(operation, {"calls": 0, "coalesced": 0})
+        stats["calls"] += 1
+
+        full_key = (operation, key)
+        task = self._calls.get(full_key)
+        if task is None:
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            self._calls[full_key] = task
+            task.add_done_callback(lambda t: self._done(full_key, t))
+        else:
+            stats["coalesced"] += 1
+            logger.debug(f"Запрос {operation} {key} объединён с уже идущим")
+
+        # shield: отмена одного ожидающего не отменяет загрузку для остальных
+        return await asyncio.shield(task)
+
+    def _done(self, full_key, task):
+        if self._calls.get(full_key) is task:
+            del self._calls[full_key]
+        # Если все ожидающие отменились, ошибку никто не заберёт — забираем сами
+        if not task.cancelled():
+            task.exception()
+
+
+flights = SingleFlight()
+
+
+def single_flight(operation: str):
+    """Декоратор для корутин: ключ — операция и аргументы вызова."""
+
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            return await flights.do(operation, key, func, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -1,4 +1,5 @@
 import asyncio
+import html
 import logging
 from textwrap import dedent
 
@@ -7,10 +8,49 @@ from telegram.constants import ParseMode
 from telegram.ext import ContextTypes
 
 from core.auth import require_auth
+from core.singleflight import flights, single_flight
+from proxmox.client import get_client_stats
+from system.collector import host_collector
+from system.disks import disk_probe
 from system.sensors import get_status
+from config import HISTORY, STATUS
 
 logger = logging.getLogger(__name__)
 
+BREAKER_STATES = {
+    "closed": "✅ доступен",
+    "half_open": "⚠️ проверка связи",
+    "open": "⛔ недоступен (запросы временно не отправляются)",
+}
+
+
+def format_api_stats(stats: dict) -> str:
+    if "breaker_state" not in stats:
+        return ""
+    return (
+        f"\n\n🔌 <b>Proxmox API</b> ({html.escape(stats['host'])}): "
+        f"{BREAKER_STATES.get(stats['breaker_state'], stats['breaker_state'])}\n"
+        f"Повторов: {stats['retries']}, исчерпано попыток: {stats['exhausted']}, "
+        f"отклонено предохранителем: {stats['rejected']}"
+    )
+
+
+def format_coalesce_stats(stats: dict) -> str:
+    coalesced = {op: s for op, s in stats.items() if s["coalesced"]}
+    if not coalesced:
+        return ""
+    return "\n🔁 Объединено одинаковых запросов: " + ", ".join(
+        f"{op} {s['coalesced']}/{s['calls']}" for op, s in sorted(coalesced.items())
+    )
+
+
+@single_flight("status")
+async def _collect_status():
+    return await asyncio.gather(
+        host_collector.snapshot(max_age=HISTORY.sample_interval),
+        disk_probe.usage(timeout=STATUS.disk_timeout),
+    )
+
 
 @require_auth
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -20,9 +60,12 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         <b>Команды:</b>
         /status - Состояние хоста
+        /graph - Графики CPU, RAM и температуры
         /vm - Список VM
         /lxc - Список LXC
         /console &lt;cmd&gt; - Выполнить команду
+
+        Поиск VM/LXC по имени, ID или тегу: <code>@бот запрос</code> в любом чате
     """
     )
     await update.message.reply_text(help_text, parse_mode=ParseMode.HTML)
@@ -31,11 +74,13 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
 @require_auth
 async def status(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
-        loop = asyncio.get_running_loop()
-        info = await loop.run_in_executor(None, get_status)
+        sample, disks = await _collect_status()
+        info = get_status(sample, disks)
 
         await update.message.reply_text(
-            f"📊 <b>Статус хоста:</b>\n{info}", parse_mode=ParseMode.HTML
+            f"📊 <b>Статус хоста:</b>\n{info}{format_api_stats(get_client_stats())}"
+            f"{format_coalesce_stats(flights.stats)}",
+            parse_mode=ParseMode.HTML,
         )
     except Exception as e:
         logger.exception("Ошибка при получении статуса хоста:")
@@ -5,6 +5,9 @@ import html
 from telegram import Update
 from telegram.ext import ContextTypes
 from core.auth import require_auth
+from core.process import StreamingProcess
+from core.live_message import LiveOutput, cancel_keyboard, exit_note
+from config import TERMINAL
 
 DANGEROUS_PATTERNS = [
     r"\brm\s+-rf\s+/\b",
@@ -42,44 +45,26 @@ async def console(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
 
-    try:
-        process = await asyncio.create_subprocess_shell(
-            cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-            executable="/bin/bash",
-        )
-
-        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=30.0)
-
-        output = stdout.decode("utf-8", errors="replace")
-        err_output = stderr.decode("utf-8", errors="replace")
-
-        if err_output:
-            output += f"\nSTDERR: {err_output}"
+    process = StreamingProcess(
+        ["/bin/bash", "-c", cmd],
+        timeout=TERMINAL.console_timeout,
+        max_output=TERMINAL.max_output,
+    )
+    cancel_markup = cancel_keyboard(process)
+    message = await update.message.reply_text(
+        "⏳ Выполняется...", reply_markup=cancel_markup
+    )
+    live = LiveOutput(message, cancel_markup)
 
-        if not output.strip():
-            output = "Команда выполнена без вывода."
+    runner = asyncio.create_task(process.run())
+    await live.follow(runner, process.output)
 
-        if len(output) > 4000:
-            output = output[:4000] + "\n... (вывод обрезан)"
-
-        safe_output = html.escape(output)
-
-        await update.message.reply_text(
-            f"<pre><code>{safe_output}</code></pre>", parse_mode="HTML"
-        )
-
-    except asyncio.TimeoutError:
-        try:
-            process.kill()
-        except ProcessLookupError:
-            pass
-
-        await update.message.reply_text(
-            "❌ Таймаут: команда выполняется слишком долго и была принудительно завершена."
-        )
+    try:
+        await runner
     except Exception as e:
-        await update.message.reply_text(
+        await message.edit_text(
             f"❌ Ошибка выполнения: {html.escape(str(e))}", parse_mode="HTML"
         )
+        return
+
+    await live.finish(process.output, exit_note(process))
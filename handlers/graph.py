@@ -0,0 +1,78 @@
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.constants import ParseMode
+from telegram.error import BadRequest
+from telegram.ext import ContextTypes
+
+from core.auth import require_auth
+from core.charts import format_chart
+from system.history import host_history
+
+TIER_TITLES = {"1h": "1 час", "24h": "24 часа", "7d": "7 дней"}
+
+
+def _build_graph(tier: str):
+    charts = [
+        format_chart(
+            "⚡ CPU",
+            [v for _, v in host_history.points(tier, "cpu")],
+            "%",
+            low=0,
+            high=100,
+        ),
+        format_chart(
+            "💻 RAM",
+            [v for _, v in host_history.points(tier, "ram")],
+            "%",
+            low=0,
+            high=100,
+        ),
+    ]
+    temps = [v for _, v in host_history.points(tier, "temp")]
+    if temps:
+        charts.append(format_chart("🌡️ Температура CPU", temps, "°C"))
+
+    text = f"📈 <b>Хост за {TIER_TITLES[tier]}</b>\n\n" + "\n\n".join(charts)
+    keyboard = [
+        [
+            InlineKeyboardButton(
+                f"• {title} •" if name == tier else title,
+                callback_data=f"graph:{name}",
+            )
+            for name, title in TIER_TITLES.items()
+        ]
+    ]
+    return text, InlineKeyboardMarkup(keyboard)
+
+
+@require_auth
+async def graph(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    tier = context.args[0].lower() if context.args else "1h"
+    if tier not in TIER_TITLES:
+        await update.message.reply_text(
+            f"Укажите период: /graph {' | '.join(TIER_TITLES)}"
+        )
+        return
+
+    text, markup = _build_graph(tier)
+    await update.message.reply_text(
+        text, parse_mode=ParseMode.HTML, reply_markup=markup
+    )
+
+
+@require_auth
+async def graph_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
+
+    tier = query.data.split(":", 1)[1]
+    if tier not in TIER_TITLES:
+        return
+
+    text, markup = _build_graph(tier)
+    try:
+        await query.edit_message_text(
+            text, parse_mode=ParseMode.HTML, reply_markup=markup
+        )
+    except BadRequest as e:
+        if "not modified" not in str(e).lower():
+            raise
@@ -1,21 +1,42 @@
-import logging
 import asyncio
+import logging
+import math
+import time
+from collections import Counter, defaultdict
+from functools import partial
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.constants import ParseMode
 from telegram.ext import ContextTypes
-from proxmox.vms import get_vm_list, vm_action
-from proxmox.lxcs import get_lxc_list, lxc_action
+from proxmox.vms import get_vm_list, get_vm, get_vm_rrd, vm_action
+from proxmox.lxcs import get_lxc_list, get_lxc, get_lxc_rrd, lxc_action
+from proxmox.cache import inventory_cache, rrd_cache
+from proxmox.tasks import describe_task, wait_for_task
 from proxmox.utils import format_uptime
 from core.auth import require_auth
+from core.charts import format_chart
+from config import PROXMOX
 
 logger = logging.getLogger(__name__)
 
+BULK_PROGRESS_INTERVAL = 2.0
+LIST_PAGE_SIZE = 20
+
+# Периоды графиков: кнопка, заголовок и шаг точек RRD Proxmox (он же TTL кэша)
+RRD_TIMEFRAMES = {
+    "hour": ("Час", "час", 60),
+    "day": ("Сутки", "сутки", 1800),
+    "week": ("Неделя", "неделю", 10800),
+}
+
 
 class ResourceHandler:
     def __init__(self, resource_type: str):
         self.resource_type = resource_type
         self.get_list_func = get_vm_list if resource_type == "vm" else get_lxc_list
+        self.get_one_func = get_vm if resource_type == "vm" else get_lxc
         self.action_func = vm_action if resource_type == "vm" else lxc_action
+        self.get_rrd_func = get_vm_rrd if resource_type == "vm" else get_lxc_rrd
         self.resource_name_ru = "VM" if resource_type == "vm" else "LXC"
 
     def _get_status_display(self, status: str):
@@ -26,14 +47,35 @@ class ResourceHandler:
             status_text = "Запущен" if status == "running" else "Остановлен"
         return status_emoji, status_text
 
-    def _get_resource_by_id(self, resources: list, resource_id: str):
-        return next((r for r in resources if r["id"] == int(resource_id)), None)
+    async def _load_sorted_resources(self):
+        # В кэш кладётся уже отсортированный список: страницы — это срезы,
+        # листание не сортирует и не запрашивает API заново
+        return sorted(await self.get_list_func(), key=lambda x: x["id"])
+
+    async def _fetch_resources_async(self, fresh=False):
+        if fresh:
+            inventory_cache.invalidate(self.resource_type)
+        return await inventory_cache.get(
+            (self.resource_type, "list"),
+            self._load_sorted_resources,
+        )
 
-    async def _fetch_resources_async(self):
-        return await asyncio.to_thread(self.get_list_func)
+    async def _fetch_resource_async(self, resource_id, node, fresh=False):
+        if fresh:
+            inventory_cache.invalidate(self.resource_type)
+        try:
+            return await inventory_cache.get(
+                (self.resource_type, int(resource_id)),
+                partial(self.get_one_func, int(resource_id), node),
+            )
+        except Exception as e:
+            logger.error(
+                f"Ошибка получения {self.resource_type} {resource_id} на {node}: {e}"
+            )
+            raise
 
     async def _run_action_async(self, resource_id, action, node):
-        return await asyncio.to_thread(self.action_func, resource_id, action, node=node)
+        return await self.action_func(resource_id, action, node=node)
 
     async def handle_list(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         try:
@@ -42,10 +84,11 @@ class ResourceHandler:
                 await update.message.reply_text(f"{self.resource_name_ru} не найдены.")
                 return
 
-            keyboard = self._build_list_keyboard(resources)
+            view = self._get_view(context)
+            view["page"] = 0
+            text, keyboard = self._build_list_view(resources, view)
             await update.message.reply_text(
-                f"Выбери {self.resource_name_ru}:",
-                reply_markup=InlineKeyboardMarkup(keyboard),
+                text, reply_markup=InlineKeyboardMarkup(keyboard)
             )
         except Exception as e:
             logger.error(f"Ошибка получения списка {self.resource_type}: {e}")
@@ -57,7 +100,10 @@ class ResourceHandler:
             "id": resource_id,
             "node": node,
         }
-        await update.callback_query.message.reply_text(
+        # Детали могли открыть из inline-поиска: у такого сообщения нет
+        # callback_query.message, поэтому пишем пользователю в личный чат
+        await context.bot.send_message(
+            update.callback_query.from_user.id,
             f"💻 **Вход в терминал {self.resource_name_ru} {resource_id}**\n\n"
             "Все твои следующие сообщения будут отправляться как команды.\n"
             "Для выхода напиши `exit`.",
@@ -70,31 +116,168 @@ class ResourceHandler:
         data = query.data
 
         try:
+            if data == f"{self.resource_type}_noop":
+                return
             if data == f"{self.resource_type}_refresh":
-                await self._refresh_list(query)
+                await self._refresh_list(query, context)
+                return
+            if data == f"{self.resource_type}_reload":
+                await self._refresh_list(query, context, fresh=True)
+                return
+            if data == f"{self.resource_type}_filters":
+                await self._show_filters(query, context)
+                return
+            if data == f"{self.resource_type}_freset":
+                view = self._get_view(context)
+                view.update(page=0, bulk_page=0, node=None, status=None, tag=None)
+                await self._refresh_list(query, context)
+                return
+            if data == f"{self.resource_type}_bulk":
+                await self._show_bulk_selection(query, context)
+                return
+            if data == f"{self.resource_type}_bulkclear":
+                self._get_selection(context).clear()
+                await self._show_bulk_selection(query, context)
+                return
+            if data == f"{self.resource_type}_tags":
+                await self._show_group_selector(query, "tag")
+                return
+            if data == f"{self.resource_type}_pools":
+                await self._show_group_selector(query, "pool")
                 return
 
             parts = data.split(":")
             action_type = parts[0]
 
-            if action_type == f"{self.resource_type}_select" and len(parts) == 3:
+            if action_type == f"{self.resource_type}_page" and len(parts) == 2:
+                self._get_view(context)["page"] = int(parts[1])
+                await self._refresh_list(query, context)
+            elif action_type == f"{self.resource_type}_bpage" and len(parts) == 2:
+                self._get_view(context)["bulk_page"] = int(parts[1])
+                await self._show_bulk_selection(query, context)
+            elif (
+                action_type
+                in (
+                    f"{self.resource_type}_fnode",
+                    f"{self.resource_type}_fstatus",
+                    f"{self.resource_type}_ftag",
+                )
+                and len(parts) == 2
+            ):
+                key = action_type.rsplit("_f", 1)[1]
+                await self._set_filter(query, context, key, parts[1])
+            elif action_type == f"{self.resource_type}_select" and len(parts) == 3:
                 await self._show_resource_details(query, parts[1], parts[2])
+            elif action_type == f"{self.resource_type}_reload" and len(parts) == 3:
+                await self._show_resource_details(query, parts[1], parts[2], fresh=True)
             elif action_type == f"{self.resource_type}_action" and len(parts) == 4:
-                await self._handle_resource_action(query, parts[1], parts[2], parts[3])
+                await self._handle_resource_action(
+                    query, context, parts[1], parts[2], parts[3]
+                )
             elif action_type == f"{self.resource_type}_confirm" and len(parts) == 4:
                 await self._handle_confirmed_action(query, parts[1], parts[2], parts[3])
+            elif action_type == f"{self.resource_type}_charts" and len(parts) == 4:
+                await self._show_charts(query, parts[1], parts[2], parts[3])
             elif action_type == f"{self.resource_type}_console" and len(parts) == 3:
                 await self._enable_console_mode(update, context, parts[1], parts[2])
+            elif action_type == f"{self.resource_type}_toggle" and len(parts) == 2:
+                self._get_selection(context).symmetric_difference_update(
+                    {int(parts[1])}
+                )
+                await self._show_bulk_selection(query, context)
+            elif action_type == f"{self.resource_type}_tag" and len(parts) == 2:
+                await self._select_group(query, context, "tag", parts[1])
+            elif action_type == f"{self.resource_type}_pool" and len(parts) == 2:
+                await self._select_group(query, context, "pool", parts[1])
+            elif action_type == f"{self.resource_type}_bulkconfirm" and len(parts) == 2:
+                await self._confirm_bulk_action(query, context, parts[1])
+            elif action_type == f"{self.resource_type}_bulkrun" and len(parts) == 2:
+                await self._run_bulk_action(query, context, parts[1])
 
         except Exception as e:
             logger.error(f"Ошибка обработки callback {data}: {e}")
             await query.edit_message_text(f"❌ Ошибка обработки: {str(e)}")
 
-    def _build_list_keyboard(self, resources):
+    def _get_view(self, context) -> dict:
+        """Страница и фильтры списка, отдельно для каждого пользователя."""
+        views = context.user_data.setdefault("list_view", {})
+        return views.setdefault(
+            self.resource_type,
+            {"page": 0, "bulk_page": 0, "node": None, "status": None, "tag": None},
+        )
+
+    def _apply_filters(self, resources, view):
+        if not (view["node"] or view["status"] or view["tag"]):
+            return resources
+        return [
+            r
+            for r in resources
+            if (view["node"] is None or r["node"] == view["node"])
+            and (
+                view["status"] is None
+                or (r["status"] == "running") == (view["status"] == "running")
+            )
+            and (view["tag"] is None or view["tag"] in r.get("tags", []))
+        ]
+
+    def _slice_page(self, resources, page):
+        pages = max(1, math.ceil(len(resources) / LIST_PAGE_SIZE))
+        page = min(max(page, 0), pages - 1)
+        start = page * LIST_PAGE_SIZE
+        return resources[start : start + LIST_PAGE_SIZE], page, pages
+
+    def _build_page_row(self, page, pages, prefix):
+        if pages <= 1:
+            return []
+
+        def target(to_page):
+            # Кнопка за краем списка ничего не делает: повторная правка тем же
+            # текстом вернула бы ошибку "message is not modified"
+            if to_page < 0 or to_page >= pages:
+                return f"{self.resource_type}_noop"
+            return f"{self.resource_type}_{prefix}:{to_page}"
+
+        return [
+            [
+                InlineKeyboardButton("◀️", callback_data=target(page - 1)),
+                InlineKeyboardButton(
+                    f"{page + 1}/{pages}", callback_data=f"{self.resource_type}_noop"
+                ),
+                InlineKeyboardButton("▶️", callback_data=target(page + 1)),
+            ]
+        ]
+
+    def _describe_filters(self, view):
+        parts = []
+        if view["node"]:
+            parts.append(f"узел {view['node']}")
+        if view["status"]:
+            parts.append(
+                "запущенные" if view["status"] == "running" else "остановленные"
+            )
+        if view["tag"]:
+            parts.append(f"тег {view['tag']}")
+        return ", ".join(parts)
+
+    def _build_list_view(self, resources, view):
+        filtered = self._apply_filters(resources, view)
+        page_items, view["page"], pages = self._slice_page(filtered, view["page"])
+
+        text = f"Выбери {self.resource_name_ru}:"
+        if len(filtered) != len(resources):
+            text = f"Выбери {self.resource_name_ru} (найдено {len(filtered)} из {len(resources)}):"
+        elif pages > 1:
+            text = f"Выбери {self.resource_name_ru} (всего {len(resources)}):"
+        filters = self._describe_filters(view)
+        if filters:
+            text += f"\nФильтр: {filters}"
+
+        return text, self._build_list_keyboard(page_items, view["page"], pages)
+
+    def _build_list_keyboard(self, resources, page=0, pages=1):
         keyboard = []
-        sorted_resources = sorted(resources, key=lambda x: x["id"])
 
-        for resource in sorted_resources:
+        for resource in resources:
             status_emoji, status_text = self._get_status_display(resource["status"])
             btn_text = (
                 f"{resource['id']} {resource['name']} {status_emoji}{status_text}"
@@ -107,30 +290,115 @@ class ResourceHandler:
                 [InlineKeyboardButton(btn_text, callback_data=callback_data)]
             )
 
+        keyboard.extend(self._build_page_row(page, pages, "page"))
         keyboard.append(
             [
                 InlineKeyboardButton(
-                    "Обновить", callback_data=f"{self.resource_type}_refresh"
-                )
+                    "☑️ Несколько", callback_data=f"{self.resource_type}_bulk"
+                ),
+                InlineKeyboardButton(
+                    "🏷 По тегу", callback_data=f"{self.resource_type}_tags"
+                ),
+                InlineKeyboardButton(
+                    "📦 По пулу", callback_data=f"{self.resource_type}_pools"
+                ),
+            ]
+        )
+        keyboard.append(
+            [
+                InlineKeyboardButton(
+                    "🔎 Фильтры", callback_data=f"{self.resource_type}_filters"
+                ),
+                InlineKeyboardButton(
+                    "Обновить", callback_data=f"{self.resource_type}_reload"
+                ),
             ]
         )
         return keyboard
 
-    async def _refresh_list(self, query):
-        resources = await self._fetch_resources_async()
+    async def _refresh_list(self, query, context, fresh=False):
+        # fresh — явное «Обновить»: список перечитывается из API, а не из кэша
+        resources = await self._fetch_resources_async(fresh=fresh)
         if not resources:
             await query.edit_message_text(f"{self.resource_name_ru} не найдены.")
             return
 
-        keyboard = self._build_list_keyboard(resources)
-        await query.edit_message_text(
-            f"Выбери {self.resource_name_ru}:",
-            reply_markup=InlineKeyboardMarkup(keyboard),
-        )
+        text, keyboard = self._build_list_view(resources, self._get_view(context))
+        await query.edit_message_text(text, reply_markup=InlineKeyboardMarkup(keyboard))
 
-    async def _show_resource_details(self, query, resource_id, node):
+    async def _show_filters(self, query, context):
         resources = await self._fetch_resources_async()
-        resource_info = self._get_resource_by_id(resources, resource_id)
+        view = self._get_view(context)
+
+        def button(label, key, value):
+            mark = "✅ " if view[key] == value else ""
+            callback_data = f"{self.resource_type}_f{key}:{value}"
+            if len(callback_data.encode()) > 64:
+                return None
+            return InlineKeyboardButton(f"{mark}{label}", callback_data=callback_data)
+
+        keyboard = []
+        nodes = Counter(r["node"] for r in resources)
+        keyboard.extend(
+            [b]
+            for b in (
+                button(f"🖥 {node} ({count})", "node", node)
+                for node, count in sorted(nodes.items())
+            )
+            if b
+        )
+        keyboard.append(
+            [
+                button("🟢 Запущенные", "status", "running"),
+                button("🔴 Остановленные", "status", "stopped"),
+            ]
+        )
+        tags = Counter(tag for r in resources for tag in r.get("tags", []))
+        keyboard.extend(
+            [b]
+            for b in (
+                button(f"🏷 {tag} ({count})", "tag", tag)
+                for tag, count in sorted(tags.items())
+            )
+            if b
+        )
+        keyboard.append(
+            [
+                InlineKeyboardButton(
+                    "✖️ Сбросить", callback_data=f"{self.resource_type}_freset"
+                ),
+                InlineKeyboardButton(
+                    "Назад к списку", callback_data=f"{self.resource_type}_refresh"
+                ),
+            ]
+        )
+
+        text = "Фильтры списка (повторное нажатие снимает фильтр):"
+        filters = self._describe_filters(view)
+        if filters:
+            text += f"\nСейчас: {filters}"
+        await query.edit_message_text(text, reply_markup=InlineKeyboardMarkup(keyboard))
+
+    async def _set_filter(self, query, context, key, value):
+        view = self._get_view(context)
+        view[key] = None if view[key] == value else value
+        view["page"] = 0
+        view["bulk_page"] = 0
+        await self._refresh_list(query, context)
+
+    async def _show_resource_details(self, query, resource_id, node, fresh=False):
+        try:
+            resource_info = await self._fetch_resource_async(
+                resource_id, node, fresh=fresh
+            )
+        except ValueError:
+            # Гостя нет в кластере (find_node_by_vmid не нашёл ноду)
+            resource_info = None
+        except Exception as e:
+            await query.edit_message_text(
+                f"❌ Не удалось получить {self.resource_name_ru} {resource_id}: {e}"
+            )
+            return
 
         if not resource_info:
             await query.edit_message_text(
@@ -139,7 +407,7 @@ class ResourceHandler:
             return
 
         details_text = self._format_resource_details(resource_info)
-        keyboard = self._build_details_keyboard(resource_id, node)
+        keyboard = self._build_details_keyboard(resource_id, resource_info["node"])
         await query.edit_message_text(
             details_text, reply_markup=InlineKeyboardMarkup(keyboard)
         )
@@ -186,6 +454,12 @@ class ResourceHandler:
                     callback_data=f"{self.resource_type}_confirm:reboot:{resource_id}:{node}",
                 )
             ],
+            [
+                InlineKeyboardButton(
+                    "📈 Графики",
+                    callback_data=f"{self.resource_type}_charts:{resource_id}:{node}:hour",
+                )
+            ],
             [
                 InlineKeyboardButton(
                     "💻 Консоль",
@@ -195,7 +469,7 @@ class ResourceHandler:
             [
                 InlineKeyboardButton(
                     "🔄 Обновить детали",
-                    callback_data=f"{self.resource_type}_select:{resource_id}:{node}",
+                    callback_data=f"{self.resource_type}_reload:{resource_id}:{node}",
                 )
             ],
             [
@@ -205,6 +479,78 @@ class ResourceHandler:
             ],
         ]
 
+    async def _load_charts(self, resource_id, node, timeframe):
+        rows = await self.get_rrd_func(int(resource_id), node, timeframe)
+        return self._format_charts(resource_id, rows, timeframe)
+
+    def _format_charts(self, resource_id, rows, timeframe):
+        def series(key, scale=1.0, total_key=None):
+            values = []
+            for row in rows:
+                value = row.get(key)
+                if value is None:
+                    continue
+                if total_key:
+                    if not row.get(total_key):
+                        continue
+                    value = value / row[total_key] * 100
+                values.append(value * scale)
+            return values
+
+        charts = [
+            format_chart("⚡ CPU", series("cpu", 100), "%", low=0, high=100),
+            format_chart(
+                "🧠 RAM", series("mem", total_key="maxmem"), "%", low=0, high=100
+            ),
+            format_chart("🌐 Сеть, вход", series("netin", 1 / 1024), " КБ/с"),
+            format_chart("🌐 Сеть, выход", series("netout", 1 / 1024), " КБ/с"),
+            format_chart("💾 Диск, чтение", series("diskread", 1 / 1024**2), " МБ/с"),
+            format_chart("💾 Диск, запись", series("diskwrite", 1 / 1024**2), " МБ/с"),
+        ]
+        title = RRD_TIMEFRAMES[timeframe][1]
+        return (
+            f"📈 <b>{self.resource_name_ru} {resource_id} за {title}</b>\n\n"
+            + "\n\n".join(charts)
+        )
+
+    async def _show_charts(self, query, resource_id, node, timeframe):
+        if timeframe not in RRD_TIMEFRAMES:
+            return
+
+        # Кэш по (vmid, период) с TTL, равным шагу RRD: чаще новых точек
+        # всё равно не появится, повторный просмотр не качает и не рисует заново
+        text = await rrd_cache.get(
+            (self.resource_type, int(resource_id), timeframe),
+            partial(self._load_charts, resource_id, node, timeframe),
+            ttl=RRD_TIMEFRAMES[timeframe][2],
+        )
+
+        keyboard = [
+            [
+                (
+                    InlineKeyboardButton(
+                        f"• {label} •",
+                        callback_data=f"{self.resource_type}_noop",
+                    )
+                    if name == timeframe
+                    else InlineKeyboardButton(
+                        label,
+                        callback_data=f"{self.resource_type}_charts:{resource_id}:{node}:{name}",
+                    )
+                )
+                for name, (label, _, _) in RRD_TIMEFRAMES.items()
+            ],
+            [
+                InlineKeyboardButton(
+                    "Назад к деталям",
+                    callback_data=f"{self.resource_type}_select:{resource_id}:{node}",
+                )
+            ],
+        ]
+        await query.edit_message_text(
+            text, parse_mode=ParseMode.HTML, reply_markup=InlineKeyboardMarkup(keyboard)
+        )
+
     async def _handle_confirmed_action(self, query, action, resource_id, node):
         action_text = {
             "start": "запуск",
@@ -230,41 +576,309 @@ class ResourceHandler:
             reply_markup=InlineKeyboardMarkup(keyboard),
         )
 
-    async def _handle_resource_action(self, query, action, resource_id, node):
+    async def _handle_resource_action(self, query, context, action, resource_id, node):
         await query.edit_message_text(
             f"⏳ Выполняю {action} для {self.resource_name_ru} {resource_id}..."
         )
 
         try:
-            result = await self._run_action_async(resource_id, action, node)
+            try:
+                result = await self._run_action_async(resource_id, action, node)
+            finally:
+                inventory_cache.invalidate(self.resource_type)
+        except Exception as e:
+            await self._handle_action_error(query, str(e))
+            return
 
-            target_status = "running" if action in ["start", "reboot"] else "stopped"
-            max_attempts = 5
+        if not result["upid"]:
+            await self._refresh_after_action(
+                query, resource_id, result["node"], result["message"]
+            )
+            return
 
-            for _ in range(max_attempts):
-                await asyncio.sleep(2)
-                resources = await self._fetch_resources_async()
-                res = self._get_resource_by_id(resources, resource_id)
-                if res and res["status"] == target_status:
-                    break
+        await query.edit_message_text(
+            f"⏳ {self.resource_name_ru} {resource_id}: {result['message']} "
+            "Жду завершения задачи..."
+        )
+        # Задача Proxmox может идти минутами: ждём её в фоне, чтобы не держать
+        # очередь апдейтов (остальные команды и пользователи не ждут)
+        context.application.create_task(self._finish_action(query, resource_id, result))
 
-            await self._refresh_after_action(query, resource_id, node, result)
+    async def _finish_action(self, query, resource_id, result):
+        try:
+            task = await wait_for_task(result["node"], result["upid"])
+            inventory_cache.invalidate(self.resource_type)
+            await self._refresh_after_action(
+                query, resource_id, result["node"], describe_task(task)
+            )
         except Exception as e:
-            await self._handle_action_error(query, str(e))
+            logger.error(
+                f"Ошибка ожидания задачи {self.resource_type} {resource_id}: {e}"
+            )
+            try:
+                await self._handle_action_error(query, str(e))
+            except Exception as edit_error:
+                logger.debug(f"Не удалось показать ошибку: {edit_error}")
 
     async def _refresh_after_action(self, query, resource_id, node, result_message):
-        resources = await self._fetch_resources_async()
-        resource_info = self._get_resource_by_id(resources, resource_id)
+        try:
+            resource_info = await self._fetch_resource_async(
+                resource_id, node, fresh=True
+            )
+        except Exception as e:
+            await query.edit_message_text(
+                f"{result_message}\n\n⚠️ Не удалось обновить данные: {e}"
+            )
+            return
 
         if resource_info:
             details_text = self._format_resource_details(resource_info)
             keyboard = self._build_details_keyboard(resource_id, node)
             await query.edit_message_text(
-                details_text, reply_markup=InlineKeyboardMarkup(keyboard)
+                f"{result_message}\n\n{details_text}",
+                reply_markup=InlineKeyboardMarkup(keyboard),
             )
         else:
             await query.edit_message_text(f"✅ Действие выполнено. {result_message}")
 
+    def _get_selection(self, context) -> set:
+        selections = context.user_data.setdefault("bulk_selection", {})
+        return selections.setdefault(self.resource_type, set())
+
+    def _build_bulk_keyboard(self, resources, selected, page=0, pages=1):
+        keyboard = []
+        for resource in resources:
+            mark = "✅" if resource["id"] in selected else "▫️"
+            status_emoji, _ = self._get_status_display(resource["status"])
+            keyboard.append(
+                [
+                    InlineKeyboardButton(
+                        f"{mark} {resource['id']} {resource['name']} {status_emoji}",
+                        callback_data=f"{self.resource_type}_toggle:{resource['id']}",
+                    )
+                ]
+            )
+
+        keyboard.extend(self._build_page_row(page, pages, "bpage"))
+        if selected:
+            keyboard.append(
+                [
+                    InlineKeyboardButton(
+                        "▶️ Запустить",
+                        callback_data=f"{self.resource_type}_bulkconfirm:start",
+                    ),
+                    InlineKeyboardButton(
+                        "⏹️ Остановить",
+                        callback_data=f"{self.resource_type}_bulkconfirm:stop",
+                    ),
+                    InlineKeyboardButton(
+                        "🔄 Перезагрузить",
+                        callback_data=f"{self.resource_type}_bulkconfirm:reboot",
+                    ),
+                ]
+            )
+            keyboard.append(
+                [
+                    InlineKeyboardButton(
+                        "Снять выбор", callback_data=f"{self.resource_type}_bulkclear"
+                    )
+                ]
+            )
+
+        keyboard.append(
+            [
+                InlineKeyboardButton(
+                    "Назад к списку", callback_data=f"{self.resource_type}_refresh"
+                )
+            ]
+        )
+        return keyboard
+
+    async def _show_bulk_selection(self, query, context):
+        resources = await self._fetch_resources_async()
+        selected = self._get_selection(context)
+        selected.intersection_update(r["id"] for r in resources)
+
+        view = self._get_view(context)
+        page_items, view["bulk_page"], pages = self._slice_page(
+            self._apply_filters(resources, view), view["bulk_page"]
+        )
+        keyboard = self._build_bulk_keyboard(
+            page_items, selected, view["bulk_page"], pages
+        )
+        text = (
+            f"Выбрано {self.resource_name_ru}: {len(selected)}. "
+            "Отметь нужные и выбери действие:"
+        )
+        filters = self._describe_filters(view)
+        if filters:
+            text += f"\nФильтр: {filters}"
+        await query.edit_message_text(text, reply_markup=InlineKeyboardMarkup(keyboard))
+
+    def _resource_groups(self, resource, group):
+        if group == "tag":
+            return resource.get("tags", [])
+        return [resource["pool"]] if resource.get("pool") else []
+
+    async def _show_group_selector(self, query, group):
+        resources = await self._fetch_resources_async()
+        counts = Counter(
+            name for r in resources for name in self._resource_groups(r, group)
+        )
+
+        emoji = "🏷" if group == "tag" else "📦"
+        keyboard = []
+        for name, count in sorted(counts.items()):
+            callback_data = f"{self.resource_type}_{group}:{name}"
+            if len(callback_data.encode()) > 64:
+                continue
+            keyboard.append(
+                [
+                    InlineKeyboardButton(
+                        f"{emoji} {name} ({count})", callback_data=callback_data
+                    )
+                ]
+            )
+        keyboard.append(
+            [
+                InlineKeyboardButton(
+                    "Назад к списку", callback_data=f"{self.resource_type}_refresh"
+                )
+            ]
+        )
+
+        title, empty = ("тег", "тегов") if group == "tag" else ("пул", "пулов")
+        text = (
+            f"Выбери {title}:" if counts else f"У {self.resource_name_ru} нет {empty}."
+        )
+        await query.edit_message_text(text, reply_markup=InlineKeyboardMarkup(keyboard))
+
+    async def _select_group(self, query, context, group, name):
+        resources = await self._fetch_resources_async()
+        selected = self._get_selection(context)
+        selected.clear()
+        selected.update(
+            r["id"] for r in resources if name in self._resource_groups(r, group)
+        )
+        await self._show_bulk_selection(query, context)
+
+    async def _confirm_bulk_action(self, query, context, action):
+        selected = self._get_selection(context)
+        action_text = {
+            "start": "запуск",
+            "stop": "остановку",
+            "reboot": "перезагрузку",
+        }.get(action, action)
+
+        keyboard = [
+            [
+                InlineKeyboardButton(
+                    "✅ Да", callback_data=f"{self.resource_type}_bulkrun:{action}"
+                ),
+                InlineKeyboardButton(
+                    "❌ Отмена", callback_data=f"{self.resource_type}_bulk"
+                ),
+            ]
+        ]
+        ids = ", ".join(str(vmid) for vmid in sorted(selected))
+        await query.edit_message_text(
+            f"⚠️ Точно выполнить {action_text} для {len(selected)} "
+            f"{self.resource_name_ru}?\n{ids}",
+            reply_markup=InlineKeyboardMarkup(keyboard),
+        )
+
+    def _format_bulk_progress(self, action, targets, outcomes):
+        lines = [
+            f"{resource['id']} {resource['name']}: {outcomes[resource['id']]}"
+            for resource in targets
+            if resource["id"] in outcomes
+        ]
+        done = len(outcomes) == len(targets)
+        header = (
+            f"{'✅ Готово' if done else '⏳ Выполняю'} {action} "
+            f"{self.resource_name_ru}: {len(outcomes)}/{len(targets)}"
+        )
+        text = "\n".join([header, ""] + lines).rstrip()
+        if len(text) > 4000:
+            text = text[:4000] + "\n..."
+        return text
+
+    async def _run_bulk_action(self, query, context, action):
+        selected = self._get_selection(context)
+        resources = {r["id"]: r for r in await self._fetch_resources_async()}
+        targets = [resources[vmid] for vmid in sorted(selected) if vmid in resources]
+        selected.clear()
+
+        if not targets:
+            await query.edit_message_text(
+                f"{self.resource_name_ru} для действия не выбраны."
+            )
+            return
+
+        await query.edit_message_text(self._format_bulk_progress(action, targets, {}))
+        # Пакет может идти минутами: выполняем его в фоне и правим сообщение
+        # с прогрессом, не задерживая остальные апдейты
+        context.application.create_task(self._execute_bulk(query, action, targets))
+
+    async def _execute_bulk(self, query, action, targets):
+        outcomes = {}
+        progress = {"edited_at": 0.0}
+        # Темп пакета: не больше BULK_NODE_CONCURRENCY гостей на ноду сразу,
+        # включая ожидание их задач. Общие лимиты API клиент берёт сам на
+        # каждый запрос, поэтому ожидание задач их не занимает
+        node_limits = defaultdict(
+            lambda: asyncio.Semaphore(PROXMOX.bulk_node_concurrency)
+        )
+
+        async def update_progress():
+            now = time.monotonic()
+            if len(outcomes) == len(targets):
+                return
+            if now - progress["edited_at"] < BULK_PROGRESS_INTERVAL:
+                return
+            progress["edited_at"] = now
+            try:
+                await query.edit_message_text(
+                    self._format_bulk_progress(action, targets, outcomes)
+                )
+            except Exception as e:
+                logger.debug(f"Не удалось обновить прогресс: {e}")
+
+        async def run_one(resource):
+            async with node_limits[resource["node"]]:
+                try:
+                    result = await self._run_action_async(
+                        resource["id"], action, resource["node"]
+                    )
+                    if result["upid"]:
+                        task = await wait_for_task(result["node"], result["upid"])
+                        outcomes[resource["id"]] = describe_task(task)
+                    else:
+                        outcomes[resource["id"]] = f"✅ {result['message']}"
+                except Exception as e:
+                    outcomes[resource["id"]] = f"❌ {e}"
+            await update_progress()
+
+        try:
+            await asyncio.gather(*(run_one(r) for r in targets))
+        finally:
+            inventory_cache.invalidate(self.resource_type)
+
+        keyboard = [
+            [
+                InlineKeyboardButton(
+                    "Назад к списку", callback_data=f"{self.resource_type}_refresh"
+                )
+            ]
+        ]
+        try:
+            await query.edit_message_text(
+                self._format_bulk_progress(action, targets, outcomes),
+                reply_markup=InlineKeyboardMarkup(keyboard),
+            )
+        except Exception as e:
+            logger.error(f"Не удалось показать итог массового действия: {e}")
+
     async def _handle_action_error(self, query, error_msg):
         error_lower = error_msg.lower()
 
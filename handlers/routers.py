@@ -1,17 +1,30 @@
-from telegram.ext import CommandHandler, CallbackQueryHandler, MessageHandler, filters
+from telegram.ext import (
+    CommandHandler,
+    CallbackQueryHandler,
+    InlineQueryHandler,
+    MessageHandler,
+    filters,
+)
 
 from handlers.common import start, status
 from handlers.console import console
+from handlers.graph import graph, graph_callback
 from handlers.resources import vm_list_cmd, lxc_list_cmd, vm_callback, lxc_callback
-from handlers.terminal import handle_terminal_input
+from handlers.search import inline_search
+from handlers.terminal import handle_terminal_input, terminal_callback
 
 HANDLERS = [
     CommandHandler(["start", "help"], start),
     CommandHandler("status", status),
+    CommandHandler("graph", graph),
     CommandHandler("vm", vm_list_cmd),
     CommandHandler("lxc", lxc_list_cmd),
-    CommandHandler("console", console),
+    CommandHandler("console", console, block=False),
     CallbackQueryHandler(vm_callback, pattern=r"^vm_"),
     CallbackQueryHandler(lxc_callback, pattern=r"^lxc_"),
-    MessageHandler(filters.TEXT & ~filters.COMMAND, handle_terminal_input),
+    CallbackQueryHandler(terminal_callback, pattern=r"^term_"),
+    CallbackQueryHandler(graph_callback, pattern=r"^graph:"),
+    InlineQueryHandler(inline_search),
+    # block=False: долгая команда не задерживает другие апдейты, включая «Прервать»
+    MessageHandler(filters.TEXT & ~filters.COMMAND, handle_terminal_input, block=False),
 ]
@@ -0,0 +1,76 @@
+import logging
+
+from telegram import (
+    Update,
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    InlineQueryResultArticle,
+    InputTextMessageContent,
+)
+from telegram.ext import ContextTypes
+
+from config import PROXMOX, TELEGRAM
+from proxmox.client import get_proxmox_api
+from proxmox.inventory import get_cluster_guests
+from proxmox.search import guest_search
+
+logger = logging.getLogger(__name__)
+
+INLINE_RESULTS_LIMIT = 20
+
+
+def _build_result(guest):
+    resource_type = "vm" if guest["type"] == "qemu" else "lxc"
+    type_name = "VM" if resource_type == "vm" else "LXC"
+    status_emoji = "🟢" if guest["status"] == "running" else "🔴"
+
+    description = f"{type_name} · узел {guest['node']}"
+    if guest["tags"]:
+        description += f" · теги: {', '.join(guest['tags'])}"
+
+    return InlineQueryResultArticle(
+        id=str(guest["id"]),
+        title=f"{status_emoji} {guest['id']} {guest['name']}",
+        description=description,
+        input_message_content=InputTextMessageContent(
+            f"{status_emoji} {type_name} {guest['id']} ({guest['name']}), "
+            f"узел {guest['node']}"
+        ),
+        reply_markup=InlineKeyboardMarkup(
+            [
+                [
+                    InlineKeyboardButton(
+                        "📋 Открыть",
+                        callback_data=f"{resource_type}_select:{guest['id']}:{guest['node']}",
+                    )
+                ]
+            ]
+        ),
+    )
+
+
+async def inline_search(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Inline-поиск гостей (@bot web-). Ищет только по индексу в памяти,
+    который обновляется при чтении инвентаря; Proxmox опрашивается лишь
+    один раз, если индекс ещё пуст.
+    """
+    query = update.inline_query
+
+    # Без require_auth: он оповещает админов, а inline-запрос приходит
+    # на каждое нажатие клавиши. Чужим просто отдаём пустой ответ.
+    if query.from_user.id not in TELEGRAM.whitelist:
+        logger.debug(f"Inline-запрос от неавторизованного {query.from_user.id}")
+        await query.answer([], cache_time=300, is_personal=True)
+        return
+
+    if not len(guest_search):
+        try:
+            await get_cluster_guests(get_proxmox_api(PROXMOX), "qemu")
+        except Exception as e:
+            logger.error(f"Не удалось загрузить инвентарь для поиска: {e}")
+
+    guests = guest_search.search(query.query, limit=INLINE_RESULTS_LIMIT)
+    await query.answer(
+        [_build_result(guest) for guest in guests], cache_time=0, is_personal=True
+    )
@@ -1,14 +1,48 @@
 import logging
 import asyncio
+import html
 from telegram import Update
+from telegram.error import BadRequest
 from telegram.ext import ContextTypes
 from proxmox.vms import execute_vm_command
-from proxmox.lxcs import execute_lxc_command
+from proxmox.lxcs import lxc_exec_process
 from core.auth import require_auth  # если у тебя есть декоратор
+from core.process import cancel_process
+from core.live_message import (
+    LiveOutput,
+    cancel_keyboard,
+    exit_note,
+    page_keyboard,
+    render_page,
+    reply_paged,
+)
+from core.output_buffer import output_buffer
 
 logger = logging.getLogger(__name__)
 
 
+async def _stream_lxc_command(update: Update, vmid, command):
+    process = lxc_exec_process(vmid, command)
+    cancel_markup = cancel_keyboard(process)
+    message = await update.message.reply_text(
+        "⏳ Выполняется...", reply_markup=cancel_markup
+    )
+    live = LiveOutput(message, cancel_markup)
+
+    runner = asyncio.create_task(process.run())
+    await live.follow(runner, process.output)
+
+    try:
+        await runner
+    except Exception as e:
+        await message.edit_text(
+            f"❌ Ошибка выполнения pct exec: {html.escape(str(e))}", parse_mode="HTML"
+        )
+        return
+
+    await live.finish(process.output, exit_note(process))
+
+
 @require_auth
 async def handle_terminal_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
     console_state = context.user_data.get("active_console")
@@ -33,15 +67,63 @@ async def handle_terminal_input(update: Update, context: ContextTypes.DEFAULT_TY
 
     try:
         if res_type == "vm":
-            result = await asyncio.to_thread(execute_vm_command, vmid, node, text)
+            result = await execute_vm_command(vmid, node, text)
+            await reply_paged(update.message, result)
         else:
-            result = await asyncio.to_thread(execute_lxc_command, vmid, node, text)
-
-        if len(result) > 4000:
-            result = result[:4000] + "\n... [ВЫВОД ОБРЕЗАН]"
-
-        await update.message.reply_text(f"```\n{result}\n```", parse_mode="Markdown")
+            await _stream_lxc_command(update, vmid, text)
 
     except Exception as e:
         logger.error(f"Console error: {e}")
         await update.message.reply_text(f"❌ Системная ошибка: {e}")
+
+
+@require_auth
+async def terminal_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    parts = query.data.split(":")
+
+    if parts[0] == "term_cancel" and len(parts) == 2:
+        if cancel_process(parts[1]):
+            await query.answer("Команда прерывается...")
+        else:
+            await query.answer("Команда уже завершилась.")
+        return
+
+    if parts[0] in ("term_page", "term_file"):
+        expected = 3 if parts[0] == "term_page" else 2
+        if len(parts) != expected or (expected == 3 and not parts[2].isdigit()):
+            logger.warning(f"Некорректные данные кнопки терминала: {query.data}")
+            await query.answer("Некорректная кнопка, выполните команду заново.")
+            return
+
+        entry = output_buffer.get(query.message.chat_id, parts[1])
+        if entry is None:
+            await query.answer(
+                "Вывод больше недоступен: он вытеснен из буфера.", show_alert=True
+            )
+            await query.edit_message_reply_markup(reply_markup=None)
+            return
+
+        if parts[0] == "term_file":
+            await query.answer()
+            await query.message.reply_document(
+                document=entry.text.encode("utf-8"),
+                filename=f"output_{entry.id}.txt",
+                caption="📄 Полный вывод команды",
+            )
+            return
+
+        page = min(max(int(parts[2]), 0), len(entry.pages) - 1)
+        await query.answer()
+        try:
+            await query.edit_message_text(
+                render_page(entry, page),
+                parse_mode="HTML",
+                reply_markup=page_keyboard(entry, page),
+            )
+        except BadRequest as e:
+            if "not modified" not in str(e).lower():
+                raise
+        return
+
+    await query.answer()
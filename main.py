@@ -4,9 +4,12 @@ import sys
 from telegram import Update
 from telegram.ext import Application
 from core.logger import setup_logging
-from config import TELEGRAM
+from config import TELEGRAM, WEBHOOK
+from core.dispatcher import MessageDispatcher
 from handlers.routers import HANDLERS
 from services.alerts import AlertManager
+from services.history import HistorySampler
+from proxmox.client import close_proxmox_api
 
 setup_logging()
 logger = logging.getLogger(__name__)
@@ -16,11 +19,23 @@ async def post_init(application: Application):
     """Хук, который выполняется ДО начала поллинга."""
     logger.info("Запуск фоновых сервисов...")
 
+    # Все рассылки (алерты, уведомления безопасности) идут через очереди с лимитами
+    application.bot_data["dispatcher"] = MessageDispatcher(
+        application.bot,
+        global_rate=TELEGRAM.global_rate,
+        chat_rate=TELEGRAM.chat_rate / 60,
+    )
+
     alert_manager = AlertManager(application)
     application.bot_data["alert_manager"] = alert_manager
 
     await alert_manager.start()
 
+    history_sampler = HistorySampler()
+    application.bot_data["history_sampler"] = history_sampler
+
+    await history_sampler.start()
+
 
 async def post_shutdown(application: Application):
     """Хук, который выполняется ПЕРЕД полной остановкой бота."""
@@ -29,6 +44,43 @@ async def post_shutdown(application: Application):
     if alert_manager:
         await alert_manager.stop()
 
+    history_sampler = application.bot_data.get("history_sampler")
+    if history_sampler:
+        await history_sampler.stop()
+
+    dispatcher = application.bot_data.get("dispatcher")
+    if dispatcher:
+        await dispatcher.stop()
+
+    await close_proxmox_api()
+
+
+def run_webhook(application: Application):
+    """
+    Приём обновлений через webhook: встроенный HTTP-сервер слушает
+    WEBHOOK_LISTEN:WEBHOOK_PORT, Telegram шлёт обновления на WEBHOOK_URL.
+    Запросы без правильного X-Telegram-Bot-Api-Secret-Token отклоняются.
+    С WEBHOOK_CERT/WEBHOOK_KEY сервер сам принимает HTTPS, иначе TLS
+    завершается на обратном прокси.
+    """
+    webhook_url = f"{WEBHOOK.url}/{WEBHOOK.path}"
+    logger.info(
+        f"Бот запущен в режиме webhook: {WEBHOOK.listen}:{WEBHOOK.port}/{WEBHOOK.path} "
+        f"-> {webhook_url}"
+    )
+
+    application.run_webhook(
+        listen=WEBHOOK.listen,
+        port=WEBHOOK.port,
+        url_path=WEBHOOK.path,
+        webhook_url=webhook_url,
+        secret_token=WEBHOOK.secret,
+        cert=WEBHOOK.cert or None,
+        key=WEBHOOK.key or None,
+        allowed_updates=Update.ALL_TYPES,
+        drop_pending_updates=TELEGRAM.drop_pending_updates,
+    )
+
 
 def main():
     logger.info("Сборка приложения...")
@@ -48,11 +100,14 @@ def main():
         for handler in HANDLERS:
             application.add_handler(handler)
 
-        logger.info("Бот запущен! Ожидание обновлений...")
-
-        application.run_polling(
-            allowed_updates=Update.ALL_TYPES, drop_pending_updates=True
-        )
+        if TELEGRAM.mode == "webhook":
+            run_webhook(application)
+        else:
+            logger.info("Бот запущен! Ожидание обновлений...")
+            application.run_polling(
+                allowed_updates=Update.ALL_TYPES,
+                drop_pending_updates=TELEGRAM.drop_pending_updates,
+            )
 
     except Exception as e:
         logger.error(f"Критическая ошибка при запуске бота: {e}", exc_info=True)
@@ -0,0 +1,79 @@
+import asyncio
+import logging
+import time
+
+from core.singleflight import flights
+from config import PROXMOX
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """
+    Общий кэш для данных Proxmox с поведением stale-while-revalidate:
+    устаревшее значение отдаётся сразу, а свежее подгружается в фоне.
+    Значение, просроченное больше чем на max_stale секунд, не отдаётся —
+    вызывающий ждёт загрузку.
+    Ключи — кортежи, первый элемент которых (тип ресурса) используется для инвалидации.
+    Одновременные загрузки одного ключа объединяются (name — операция в счётчиках).
+    """
+
+    def __init__(self, ttl: float, name: str, max_stale: float):
+        self.ttl = ttl
+        self.name = name
+        self.max_stale = max_stale
+        self._entries = {}
+        self._refreshing = {}
+        self._version = 0
+
+    async def get(self, key: tuple, loader, ttl: float | None = None):
+        """
+        Возвращает значение по ключу; loader — корутинная функция без аргументов.
+        ttl переопределяет время жизни для этого ключа.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return await self._load(key, loader)
+
+        stored_at, value = entry
+        ttl = self.ttl if ttl is None else ttl
+        age = time.monotonic() - stored_at
+        if age > ttl + self.max_stale:
+            return await self._load(key, loader)
+        if age > ttl and key not in self._refreshing:
+            self._refreshing[key] = asyncio.create_task(self._refresh(key, loader))
+        return value
+
+    def invalidate(self, resource_type: str):
+        """Сбрасывает записи указанного типа; начатые до этого загрузки не попадут в кэш."""
+        self._version += 1
+        for key in [k for k in self._entries if k[0] == resource_type]:
+            del self._entries[key]
+
+    async def _load(self, key, loader):
+        # Версия входит в ключ: после invalidate() новые вызовы не присоединяются
+        # к загрузке, начатой до сброса
+        version = self._version
+        return await flights.do(self.name, (key, version), self._store, key, loader)
+
+    async def _store(self, key, loader):
+        version = self._version
+        value = await loader()
+        if version == self._version:
+            self._entries[key] = (time.monotonic(), value)
+        return value
+
+    async def _refresh(self, key, loader):
+        try:
+            await self._load(key, loader)
+        except Exception as e:
+            logger.warning(f"Фоновое обновление кэша {key} не удалось: {e}")
+        finally:
+            self._refreshing.pop(key, None)
+
+
+inventory_cache = TTLCache(
+    PROXMOX.inventory_ttl, "inventory", max_stale=PROXMOX.inventory_max_stale
+)
+# Графики гостей: время жизни задаётся при чтении по шагу RRD
+rrd_cache = TTLCache(60, "rrd_charts", max_stale=60)
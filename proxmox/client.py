@@ -1,80 +1,302 @@
-import time
+import asyncio
 import logging
-import threading
-import urllib3
+import random
+import time
 from functools import wraps
-from proxmoxer import ProxmoxAPI
+from http import HTTPStatus
 
-logger = logging.getLogger(__name__)
+import httpx
 
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+from proxmox.fanout import api_slot, path_node
+
+logger = logging.getLogger(__name__)
 
 _proxmox_instance = None
-_lock = threading.Lock()
+
+# 595/596 — ошибки связи между нодами, которые Proxmox отдаёт своими кодами
+RETRYABLE_STATUS_CODES = {502, 503, 504, 595, 596}
+
+_retry_stats = {"retries": 0, "exhausted": 0}
+
+
+class ProxmoxAPIError(Exception):
+    """Ошибка ответа Proxmox API в формате proxmoxer: '500 Internal Server Error: ...'."""
+
+    def __init__(self, status_code: int, reason: str, errors=None):
+        self.status_code = status_code
+        self.reason = reason
+        self.errors = errors
+        try:
+            phrase = HTTPStatus(status_code).phrase
+        except ValueError:
+            phrase = "Unknown"
+        message = f"{status_code} {phrase}: {reason}"
+        if errors:
+            message += f" - {errors}"
+        super().__init__(message)
+
+
+class CircuitOpenError(Exception):
+    """Запрос не отправлен: предохранитель хоста разомкнут после серии сбоев."""
+
+
+class CircuitBreaker:
+    """
+    Предохранитель на хост Proxmox. После threshold подряд идущих сбоев связи
+    размыкается и сразу отклоняет запросы reset_timeout секунд, затем пропускает
+    один пробный запрос (half-open): успех замыкает цепь, сбой размыкает снова.
+    """
+
+    def __init__(self, host: str, threshold: int, reset_timeout: int):
+        self.host = host
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._probe_in_flight = False
+
+    def before_call(self):
+        if self.state == "closed":
+            return
+
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                self.rejected += 1
+                raise CircuitOpenError(
+                    f"Proxmox {self.host} недоступен, повтор не раньше чем через "
+                    f"{int(self.reset_timeout - (time.monotonic() - self.opened_at))}с"
+                )
+            self.state = "half_open"
+
+        if self._probe_in_flight:
+            self.rejected += 1
+            raise CircuitOpenError(f"Proxmox {self.host}: идёт проверка доступности")
+        self._probe_in_flight = True
+
+    def record_success(self):
+        if self.state != "closed":
+            logger.info(f"Proxmox {self.host} снова доступен, предохранитель замкнут")
+        self.state = "closed"
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.state == "half_open" or self.failures >= self.threshold:
+            if self.state != "open":
+                logger.warning(
+                    f"Proxmox {self.host}: {self.failures} сбоев подряд, предохранитель разомкнут"
+                )
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def release(self):
+        """Запрос завершился ответом API, который не говорит о здоровье хоста."""
+        if self.state == "half_open":
+            self.record_success()
+
+    def abandon(self):
+        """
+        Запрос отменён или не дождался соединения из пула: хост не ответил ни
+        так, ни иначе. Состояние не меняется, следующий запрос может стать пробным.
+        """
+        self._probe_in_flight = False
+
+
+def is_retryable_error(e: Exception) -> bool:
+    """
+    Сетевые сбои и временные 5xx стоит повторять, логические ошибки API — нет.
+    PoolTimeout — переполнение своего пула соединений, а не сбой хоста.
+    """
+    if isinstance(e, httpx.PoolTimeout):
+        return False
+    if isinstance(e, httpx.TransportError):
+        return True
+    return isinstance(e, ProxmoxAPIError) and e.status_code in RETRYABLE_STATUS_CODES
+
+
+class ProxmoxResource:
+    """
+    Путь в API, собираемый цепочкой атрибутов и вызовов, как в proxmoxer:
+    api.nodes(node).qemu(vmid).status.current.get()
+    """
+
+    def __init__(self, api: "AsyncProxmoxAPI", path: str):
+        self._api = api
+        self._path = path
+
+    def __getattr__(self, name: str) -> "ProxmoxResource":
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return ProxmoxResource(self._api, f"{self._path}/{name}")
+
+    def __call__(self, *segments) -> "ProxmoxResource":
+        path = "/".join([self._path, *(str(s) for s in segments)])
+        return ProxmoxResource(self._api, path)
+
+    async def get(self, request_timeout: float | None = None, **params):
+        return await self._api.request("GET", self._path, params, request_timeout)
+
+    async def post(self, request_timeout: float | None = None, **params):
+        return await self._api.request("POST", self._path, params, request_timeout)
+
+    async def put(self, request_timeout: float | None = None, **params):
+        return await self._api.request("PUT", self._path, params, request_timeout)
+
+    async def delete(self, request_timeout: float | None = None, **params):
+        return await self._api.request("DELETE", self._path, params, request_timeout)
+
+
+class AsyncProxmoxAPI:
+    """
+    Асинхронный клиент Proxmox API на httpx с пулом keep-alive соединений.
+    Каждый запрос занимает слот api_slot по ноде из пути, поэтому пула на
+    PROXMOX_CLUSTER_CONCURRENCY соединений хватает всем одновременным запросам.
+    """
+
+    def __init__(self, config):
+        self.host = config.host
+        self.breaker = CircuitBreaker(
+            config.host, config.breaker_threshold, config.breaker_reset
+        )
+        self._client = httpx.AsyncClient(
+            base_url=f"https://{config.host}:{config.port}/api2/json",
+            headers={
+                "Authorization": f"PVEAPIToken={config.user}!{config.token_name}={config.token_value}"
+            },
+            verify=False,
+            timeout=httpx.Timeout(config.request_timeout, connect=10),
+            limits=httpx.Limits(
+                max_connections=config.cluster_concurrency,
+                max_keepalive_connections=config.cluster_concurrency,
+                keepalive_expiry=60,
+            ),
+        )
+
+    def __getattr__(self, name: str) -> ProxmoxResource:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return ProxmoxResource(self, f"/{name}")
+
+    async def request(self, method, path, params=None, request_timeout=None):
+        timeout = (
+            httpx.Timeout(request_timeout, connect=10)
+            if request_timeout
+            else httpx.USE_CLIENT_DEFAULT
+        )
+        params = {k: v for k, v in (params or {}).items() if v is not None}
+        body = "data" if method in ("POST", "PUT") else "params"
+
+        async with api_slot(path_node(path)):
+            return await self._send(method, path, timeout, body, params)
+
+    async def _send(self, method, path, timeout, body, params):
+        self.breaker.before_call()
+        try:
+            response = await self._client.request(
+                method, path, timeout=timeout, **{body: params}
+            )
+        except (httpx.PoolTimeout, asyncio.CancelledError):
+            self.breaker.abandon()
+            raise
+        except httpx.TransportError:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            self.breaker.release()
+            raise
+
+        if response.status_code >= 400:
+            errors = None
+            try:
+                errors = response.json().get("errors")
+            except ValueError:
+                pass
+            error = ProxmoxAPIError(
+                response.status_code, response.reason_phrase, errors
+            )
+            if is_retryable_error(error):
+                self.breaker.record_failure()
+            else:
+                self.breaker.release()
+            raise error
+
+        self.breaker.record_success()
+        return response.json().get("data")
+
+    async def aclose(self):
+        await self._client.aclose()
 
 
 def get_proxmox_api(config):
     """
-    Возвращает синглтон-подключение к Proxmox API.
+    Возвращает общий асинхронный клиент Proxmox API.
     Ожидает объект ProxmoxConfig.
     """
     global _proxmox_instance
 
-    if _proxmox_instance is not None:
-        return _proxmox_instance
+    if _proxmox_instance is None:
+        logger.info(f"Создаем соединение с Proxmox: {config.host}")
+        _proxmox_instance = AsyncProxmoxAPI(config)
 
-    with _lock:
-        if _proxmox_instance is not None:
-            return _proxmox_instance
+    return _proxmox_instance
 
-        try:
-            logger.info(f"Создаем соединение с Proxmox: {config.host}")
-
-            _proxmox_instance = ProxmoxAPI(
-                host=config.host,
-                user=config.user,
-                token_name=config.token_name,
-                token_value=config.token_value,
-                verify_ssl=False,
-                port=config.port,
-                timeout=30,
-            )
-            _proxmox_instance.nodes.get()
 
-            logger.info("Соединение с Proxmox установлено")
-            return _proxmox_instance
+async def close_proxmox_api():
+    global _proxmox_instance
 
-        except Exception as e:
-            logger.error(f"Ошибка подключения к Proxmox: {e}")
-            _proxmox_instance = None
-            raise
+    if _proxmox_instance is not None:
+        await _proxmox_instance.aclose()
+        _proxmox_instance = None
 
 
-def retry_proxmox_call(max_retries=3, delay=1, catch_exceptions=(Exception,)):
+def get_client_stats():
+    """Состояние предохранителя и счётчики повторов для /status."""
+    stats = dict(_retry_stats)
+    if _proxmox_instance is not None:
+        breaker = _proxmox_instance.breaker
+        stats.update(
+            host=breaker.host,
+            breaker_state=breaker.state,
+            consecutive_failures=breaker.failures,
+            rejected=breaker.rejected,
+        )
+    return stats
+
+
+def retry_proxmox_call(
+    max_retries=3, delay=0.5, max_delay=5.0, retryable=is_retryable_error
+):
     """
-    Декоратор для повторных попыток.
-    catch_exceptions: кортеж исключений, при которых нужно повторять вызов.
-    Остальные ошибки будут пробрасываться сразу.
+    Декоратор для повторных попыток асинхронных вызовов API.
+    Повторяются только ошибки, для которых retryable(e) истинно; пауза между
+    попытками — случайная в [0, min(max_delay, delay * 2^attempt)] (full jitter).
+    Разомкнутый предохранитель и остальные ошибки пробрасываются сразу.
     """
 
     def decorator(func):
         @wraps(func)
-        def wrapper(*args, **kwargs):
-            last_exception = None
+        async def wrapper(*args, **kwargs):
             for attempt in range(max_retries):
                 try:
-                    return func(*args, **kwargs)
-                except catch_exceptions as e:
-                    last_exception = e
-                    if attempt < max_retries - 1:
-                        sleep_time = delay * (2**attempt)
-                        logger.warning(
-                            f"Попытка {attempt + 1}/{max_retries} не удалась: {e}. Повтор через {sleep_time}с"
-                        )
-                        time.sleep(sleep_time)
-
-            logger.error(f"Все {max_retries} попыток не удались: {last_exception}")
-            raise last_exception
+                    return await func(*args, **kwargs)
+                except Exception as e:
+                    if not retryable(e):
+                        raise
+                    if attempt == max_retries - 1:
+                        _retry_stats["exhausted"] += 1
+                        logger.error(f"Все {max_retries} попыток не удались: {e}")
+                        raise
+
+                    _retry_stats["retries"] += 1
+                    sleep_time = random.uniform(0, min(max_delay, delay * 2**attempt))
+                    logger.warning(
+                        f"Попытка {attempt + 1}/{max_retries} не удалась: {e}. Повтор через {sleep_time:.2f}с"
+                    )
+                    await asyncio.sleep(sleep_time)
 
         return wrapper
 
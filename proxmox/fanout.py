@@ -0,0 +1,35 @@
+import asyncio
+import logging
+from collections import defaultdict
+from contextlib import asynccontextmanager
+
+from config import PROXMOX
+
+logger = logging.getLogger(__name__)
+
+_cluster_limit = asyncio.Semaphore(PROXMOX.cluster_concurrency)
+_node_limits = defaultdict(lambda: asyncio.Semaphore(PROXMOX.node_concurrency))
+
+
+def path_node(path: str):
+    """Нода из пути вида /nodes/{node}/...; для общих путей кластера — None."""
+    parts = path.strip("/").split("/")
+    if len(parts) >= 2 and parts[0] == "nodes":
+        return parts[1]
+    return None
+
+
+@asynccontextmanager
+async def api_slot(node=None):
+    """
+    Слот общих лимитов для одного запроса: на одну ноду одновременно уходит
+    не больше PROXMOX_NODE_CONCURRENCY запросов, на весь кластер — не больше
+    PROXMOX_CLUSTER_CONCURRENCY. Его берёт каждый запрос AsyncProxmoxAPI и
+    держит только на время запроса, а не ожидания задачи Proxmox.
+    """
+    if node is None:
+        async with _cluster_limit:
+            yield
+        return
+    async with _node_limits[node], _cluster_limit:
+        yield
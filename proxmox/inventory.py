@@ -0,0 +1,124 @@
+import re
+import logging
+
+from core.singleflight import single_flight
+from proxmox.search import guest_search
+from proxmox.utils import _human_gb
+
+logger = logging.getLogger(__name__)
+
+# vmid -> (node, "qemu" | "lxc"), пересобирается при каждом чтении /cluster/resources
+_guest_index = {}
+
+
+@single_flight("cluster_snapshot")
+async def get_cluster_snapshot(proxmox):
+    """
+    Все гости кластера (VM и LXC) одним запросом /cluster/resources.
+    Попутно обновляет индекс vmid -> нода и поисковый индекс гостей.
+    Через него же идут промахи поиска ноды, так что одновременные списки,
+    алерты и поиск нод делят один запрос.
+    """
+    global _guest_index
+
+    resources = await proxmox.cluster.resources.get(type="vm")
+    _guest_index = {
+        int(res["vmid"]): (res.get("node"), res.get("type")) for res in resources
+    }
+    guest_search.update(resources)
+    return resources
+
+
+async def get_cluster_guests(proxmox, guest_type):
+    """
+    Возвращает гостей указанного типа ("qemu" или "lxc") со всего кластера
+    одним запросом /cluster/resources вместо обхода нод и гостей по одному.
+    """
+    resources = await get_cluster_snapshot(proxmox)
+    return [res for res in resources if res.get("type") == guest_type]
+
+
+def remember_guest(vmid, node, resource_type):
+    _guest_index[int(vmid)] = (node, resource_type)
+
+
+def forget_guest(vmid):
+    _guest_index.pop(int(vmid), None)
+
+
+async def find_node_by_vmid(proxmox, vmid, resource_type="qemu"):
+    """
+    Возвращает ноду гостя из индекса vmid -> нода. При промахе индекс
+    обновляется одним запросом /cluster/resources.
+    """
+    entry = _guest_index.get(int(vmid))
+    if entry and entry[1] == resource_type:
+        return entry[0]
+
+    try:
+        await get_cluster_guests(proxmox, resource_type)
+    except Exception as e:
+        logger.error(f"Ошибка поиска узла: {e}")
+        raise Exception(f"Ошибка поиска узла: {e}")
+
+    entry = _guest_index.get(int(vmid))
+    if entry and entry[1] == resource_type:
+        return entry[0]
+    raise ValueError(f"Ресурс {vmid} не найден")
+
+
+async def run_on_guest_node(proxmox, vmid, resource_type, node, func):
+    """
+    Выполняет корутину func(node) для гостя. Если node не передана, берёт её из индекса.
+    Если Proxmox ответил, что гостя на этой ноде нет (миграция, устаревший индекс),
+    нода перепроверяется одним запросом и вызов повторяется один раз.
+    """
+    if node is None:
+        node = await find_node_by_vmid(proxmox, vmid, resource_type)
+
+    try:
+        result = await func(node)
+    except Exception as e:
+        if "does not exist" not in str(e).lower():
+            raise
+
+        forget_guest(vmid)
+        actual_node = await find_node_by_vmid(proxmox, vmid, resource_type)
+        if actual_node == node:
+            raise
+
+        logger.info(f"Ресурс {vmid} переехал: {node} -> {actual_node}")
+        node = actual_node
+        result = await func(node)
+
+    remember_guest(vmid, node, resource_type)
+    return result
+
+
+def build_guest_entry(res, default_name):
+    """
+    Собирает словарь гостя (id, статус, CPU, RAM, диск, аптайм, нода, теги, пул)
+    из записи /cluster/resources или ответа status/current.
+    """
+    vmid = int(res["vmid"])
+    tags = re.split(r"[;,\s]+", res.get("tags") or "")
+
+    mem_used = int(res.get("mem", 0)) // 1024 // 1024
+    mem_total = int(res.get("maxmem", 0)) // 1024 // 1024
+    mem_pct = round(mem_used / mem_total * 100, 1) if mem_total else 0
+
+    return {
+        "id": vmid,
+        "name": res.get("name", f"{default_name}{vmid}"),
+        "status": res.get("status", "unknown"),
+        "node": res.get("node"),
+        "uptime": int(res.get("uptime", 0)),
+        "cpu_usage_percent": round(float(res.get("cpu", 0)) * 100, 1),
+        "mem_used_mb": mem_used,
+        "mem_total_mb": mem_total,
+        "mem_usage_percent": mem_pct,
+        "disk_used_gb": _human_gb(int(res.get("disk", 0))),
+        "disk_total_gb": _human_gb(int(res.get("maxdisk", 0))),
+        "tags": [tag for tag in tags if tag],
+        "pool": res.get("pool"),
+    }
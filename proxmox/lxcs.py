@@ -1,117 +1,146 @@
 import logging
-import time
-import subprocess
+from functools import partial
 
+from core.singleflight import single_flight
 from proxmox.client import get_proxmox_api, retry_proxmox_call
-from proxmox.utils import _human_gb, find_node_by_vmid
-from config import PROXMOX
+from proxmox.inventory import (
+    build_guest_entry,
+    get_cluster_guests,
+    run_on_guest_node,
+)
+from proxmox.tasks import wait_for_task
+from proxmox.utils import _human_gb
+from core.process import StreamingProcess
+from config import PROXMOX, TERMINAL
 
 logger = logging.getLogger(__name__)
 
 
+def _lxc_disk_usage(status):
+    """
+    Суммирует занятое/общее место по rootfs и точкам монтирования из status/current.
+    Возвращает None, если Proxmox не прислал разбивку по томам.
+    """
+    volumes = []
+    if isinstance(status.get("rootfs"), dict):
+        volumes.append(status["rootfs"])
+
+    for key, val in status.items():
+        if key.startswith("mp") or key.startswith("mountpoint"):
+            if isinstance(val, dict):
+                volumes.append(val)
+
+    if not volumes:
+        return None
+
+    used_gb = total_gb = 0.0
+    for vol in volumes:
+        used_gb += _human_gb(vol.get("used", 0))
+        total_gb += _human_gb(vol.get("total", 0)) or _human_gb(vol.get("max", 0))
+
+    return round(used_gb, 1), (round(total_gb, 1) if total_gb > 0 else 0.0)
+
+
 @retry_proxmox_call(max_retries=3)
-def get_lxc_list():
+async def get_lxc_list():
+    """
+    Список LXC из одного запроса /cluster/resources. Занятое место по точкам
+    монтирования, которых в нём нет, учитывается на экране деталей (get_lxc).
+    """
     proxmox = get_proxmox_api(PROXMOX)
-    lxcs = []
-    try:
-        for node in proxmox.nodes.get():
-            node_name = node["node"]
-            for ct in proxmox.nodes(node_name).lxc.get():
-                vmid = int(ct["vmid"])
-                try:
-                    status = proxmox.nodes(node_name).lxc(vmid).status.current.get()
-
-                    uptime = int(status.get("uptime", 0))
-                    cpu = round(float(status.get("cpu", 0)) * 100, 1)
-                    mem_used = int(status.get("mem", 0)) // 1024 // 1024
-                    mem_total = int(status.get("maxmem", 1)) // 1024 // 1024
-                    mem_pct = round(mem_used / mem_total * 100, 1) if mem_total else 0
-
-                    used_gb = total_gb = 0.0
-
-                    if "rootfs" in status:
-                        used_gb += _human_gb(status["rootfs"].get("used", 0))
-                        total_gb += _human_gb(
-                            status["rootfs"].get("total", 0)
-                        ) or _human_gb(status["rootfs"].get("max", 0))
-
-                    for key, val in status.items():
-                        if key.startswith("mp") or key.startswith("mountpoint"):
-                            if isinstance(val, dict):
-                                used_gb += _human_gb(val.get("used", 0))
-                                total_gb += _human_gb(val.get("total", 0)) or _human_gb(
-                                    val.get("max", 0)
-                                )
-
-                    lxcs.append(
-                        {
-                            "id": vmid,
-                            "name": ct.get("name", f"LXC{vmid}"),
-                            "status": ct.get("status", "unknown"),
-                            "node": node_name,
-                            "uptime": uptime,
-                            "cpu_usage_percent": cpu,
-                            "mem_used_mb": mem_used,
-                            "mem_total_mb": mem_total,
-                            "mem_usage_percent": mem_pct,
-                            "disk_used_gb": round(used_gb, 1),
-                            "disk_total_gb": (
-                                round(total_gb, 1) if total_gb > 0 else 0.0
-                            ),
-                        }
-                    )
-                except Exception as e:
-                    logger.error(f"[LXC {vmid}] ошибка получения данных: {e}")
-    except Exception as e:
-        logger.error(f"Ошибка получения списка LXC: {e}")
-    return lxcs
+    return [
+        build_guest_entry(res, "LXC")
+        for res in await get_cluster_guests(proxmox, "lxc")
+    ]
+
+
+@retry_proxmox_call(max_retries=3)
+async def get_lxc(vmid, node):
+    """Данные одного контейнера в том же формате, что и get_lxc_list (1 запрос к API)."""
+    proxmox = get_proxmox_api(PROXMOX)
+    return await run_on_guest_node(
+        proxmox, vmid, "lxc", node, partial(_get_lxc_on_node, proxmox, vmid)
+    )
+
 
+async def _get_lxc_on_node(proxmox, vmid, node):
+    status = await proxmox.nodes(node).lxc(vmid).status.current.get()
+    ct = build_guest_entry({**status, "vmid": vmid, "node": node}, "LXC")
 
-def lxc_action(vmid, action, node=None):
+    usage = _lxc_disk_usage(status)
+    if usage:
+        ct["disk_used_gb"], ct["disk_total_gb"] = usage
+    return ct
+
+
+@single_flight("rrd")
+@retry_proxmox_call(max_retries=3)
+async def get_lxc_rrd(vmid, node, timeframe):
+    """Точки RRD (средние) контейнера за timeframe: hour, day или week."""
+    proxmox = get_proxmox_api(PROXMOX)
+    return await run_on_guest_node(
+        proxmox,
+        vmid,
+        "lxc",
+        node,
+        lambda n: proxmox.nodes(n)
+        .lxc(vmid)
+        .rrddata.get(timeframe=timeframe, cf="AVERAGE"),
+    )
+
+
+async def lxc_action(vmid, action, node=None):
     proxmox = get_proxmox_api(PROXMOX)
+    return await run_on_guest_node(
+        proxmox, vmid, "lxc", node, partial(_lxc_action_on_node, proxmox, vmid, action)
+    )
 
-    if node is None:
-        node = find_node_by_vmid(proxmox, vmid, "lxc")
 
+async def _lxc_action_on_node(proxmox, vmid, action, node):
     if not node:
         raise ValueError(f"Контейнер с ID {vmid} не найден ни на одной ноде.")
 
     try:
         if action == "start":
-            proxmox.nodes(node).lxc(vmid).status.start.post()
-            return "Запущен"
+            upid = await proxmox.nodes(node).lxc(vmid).status.start.post()
+            return {"message": "Запущен", "node": node, "upid": upid}
 
         elif action == "stop":
             try:
-                proxmox.nodes(node).lxc(vmid).status.shutdown.post(timeout=20)
-                return "Выключается..."
+                upid = (
+                    await proxmox.nodes(node).lxc(vmid).status.shutdown.post(timeout=20)
+                )
+                return {"message": "Выключается...", "node": node, "upid": upid}
             except Exception as e:
                 logger.warning(
                     f"Мягкое выключение {vmid} не удалось ({e}), принудительная остановка."
                 )
-                proxmox.nodes(node).lxc(vmid).status.stop.post()
-                return "Принудительно остановлен"
+                upid = await proxmox.nodes(node).lxc(vmid).status.stop.post()
+                return {
+                    "message": "Принудительно остановлен",
+                    "node": node,
+                    "upid": upid,
+                }
 
         elif action == "reboot":
             try:
-                proxmox.nodes(node).lxc(vmid).status.reboot.post(timeout=20)
-                return "Перезагружается..."
+                upid = (
+                    await proxmox.nodes(node).lxc(vmid).status.reboot.post(timeout=20)
+                )
+                return {"message": "Перезагружается...", "node": node, "upid": upid}
             except Exception as e:
                 logger.warning(
                     f"Мягкая перезагрузка {vmid} не удалась ({e}), принудительный рестарт."
                 )
-                proxmox.nodes(node).lxc(vmid).status.stop.post()
-
-                for _ in range(10):
-                    curr_status = (
-                        proxmox.nodes(node).lxc(vmid).status.current.get().get("status")
-                    )
-                    if curr_status == "stopped":
-                        break
-                    time.sleep(1)
+                stop_upid = await proxmox.nodes(node).lxc(vmid).status.stop.post()
+                await wait_for_task(node, stop_upid, timeout=30)
 
-                proxmox.nodes(node).lxc(vmid).status.start.post()
-                return "Принудительно перезапущен"
+                upid = await proxmox.nodes(node).lxc(vmid).status.start.post()
+                return {
+                    "message": "Принудительно перезапущен",
+                    "node": node,
+                    "upid": upid,
+                }
 
         else:
             raise ValueError(f"Неизвестное действие: {action}")
@@ -120,20 +149,13 @@ def lxc_action(vmid, action, node=None):
         raise Exception(f"Ошибка {action} LXC {vmid}: {e}")
 
 
-def execute_lxc_command(vmid, node, command):
-    try:
-        cmd = ["pct", "exec", str(vmid), "--", "bash", "-c", command]
-
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-
-        out = result.stdout.strip()
-        err = result.stderr.strip()
-
-        if not out and not err:
-            return "✅ Команда выполнена (без вывода)"
-
-        return out if out else err
-    except subprocess.TimeoutExpired:
-        return "⏳ Превышено время выполнения команды (таймаут 30 секунд)."
-    except Exception as e:
-        return f"❌ Ошибка выполнения pct exec: {e}"
+def lxc_exec_process(vmid, command):
+    """
+    Готовит `pct exec` в контейнере как StreamingProcess: вывод читается по мере
+    появления, объём хранимого вывода и время выполнения ограничены TERMINAL_*.
+    """
+    return StreamingProcess(
+        ["pct", "exec", str(vmid), "--", "bash", "-c", command],
+        timeout=TERMINAL.exec_timeout,
+        max_output=TERMINAL.max_output,
+    )
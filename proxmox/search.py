@@ -0,0 +1,135 @@
+import bisect
+import logging
+import re
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_SPLIT = re.compile(r"[^\w]+")
+
+
+def _trigrams(text: str):
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+class GuestSearchIndex:
+    """
+    Индекс гостей для inline-поиска по имени, VMID и тегам.
+
+    Подстроки от трёх символов ищутся по триграммам, более короткие запросы —
+    по префиксам слов. Индекс обновляется из каждого чтения /cluster/resources:
+    переиндексируются только гости, у которых поменялись имя или теги.
+    """
+
+    def __init__(self):
+        self._guests = {}
+        self._haystacks = {}
+        self._trigrams = defaultdict(set)
+        self._tokens = []
+        self._tokens_dirty = False
+
+    def __len__(self):
+        return len(self._guests)
+
+    def update(self, resources):
+        seen = set()
+        changed = 0
+
+        for res in resources:
+            vmid = int(res["vmid"])
+            seen.add(vmid)
+            tags = [t for t in re.split(r"[;,\s]+", res.get("tags") or "") if t]
+            guest = {
+                "id": vmid,
+                "name": res.get("name") or str(vmid),
+                "type": res.get("type"),
+                "node": res.get("node"),
+                "status": res.get("status", "unknown"),
+                "tags": tags,
+            }
+
+            haystack = " ".join([str(vmid), guest["name"], *tags]).lower()
+            self._guests[vmid] = guest
+            if self._haystacks.get(vmid) != haystack:
+                self._unindex(vmid)
+                self._index(vmid, haystack)
+                changed += 1
+
+        for vmid in set(self._guests) - seen:
+            self._unindex(vmid)
+            del self._guests[vmid]
+            changed += 1
+
+        if changed:
+            logger.debug(f"Поисковый индекс гостей: обновлено {changed}")
+
+    def _index(self, vmid, haystack):
+        self._haystacks[vmid] = haystack
+        for trigram in _trigrams(haystack):
+            self._trigrams[trigram].add(vmid)
+        self._tokens_dirty = True
+
+    def _unindex(self, vmid):
+        haystack = self._haystacks.pop(vmid, None)
+        if haystack is None:
+            return
+        for trigram in _trigrams(haystack):
+            postings = self._trigrams.get(trigram)
+            if postings is not None:
+                postings.discard(vmid)
+                if not postings:
+                    del self._trigrams[trigram]
+        self._tokens_dirty = True
+
+    def _prefix_matches(self, prefix):
+        if self._tokens_dirty:
+            self._tokens = sorted(
+                (token, vmid)
+                for vmid, haystack in self._haystacks.items()
+                for token in set(_TOKEN_SPLIT.split(haystack))
+                if token
+            )
+            self._tokens_dirty = False
+
+        found = set()
+        start = bisect.bisect_left(self._tokens, (prefix,))
+        for token, vmid in self._tokens[start:]:
+            if not token.startswith(prefix):
+                break
+            found.add(vmid)
+        return found
+
+    def _term_matches(self, term):
+        if len(term) < 3:
+            return self._prefix_matches(term)
+
+        postings = [self._trigrams.get(t, set()) for t in _trigrams(term)]
+        candidates = set.intersection(*sorted(postings, key=len))
+        return {vmid for vmid in candidates if term in self._haystacks[vmid]}
+
+    def search(self, query: str, limit: int = 20):
+        terms = query.lower().split()
+        if not terms:
+            matches = set(self._guests)
+        else:
+            matches = None
+            for term in terms:
+                found = self._term_matches(term)
+                matches = found if matches is None else matches & found
+                if not matches:
+                    return []
+
+        first = terms[0] if terms else ""
+
+        def rank(vmid):
+            guest = self._guests[vmid]
+            return (
+                str(vmid) != first,
+                not guest["name"].lower().startswith(first),
+                vmid,
+            )
+
+        return [self._guests[vmid] for vmid in sorted(matches, key=rank)[:limit]]
+
+
+guest_search = GuestSearchIndex()
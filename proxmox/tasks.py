@@ -0,0 +1,46 @@
+import asyncio
+import logging
+import time
+
+from proxmox.client import get_proxmox_api
+from config import PROXMOX
+
+logger = logging.getLogger(__name__)
+
+TASK_POLL_START = 0.25
+TASK_POLL_MAX = 3.0
+
+
+async def wait_for_task(node, upid, timeout=None):
+    """
+    Ждёт завершения задачи Proxmox по UPID, опрашивая nodes/{node}/tasks/{upid}/status.
+    Интервал опроса начинается с 250 мс и растёт до 3 с, так что короткие задачи
+    отслеживаются почти мгновенно, а длинные не нагружают API.
+    Возвращает последний статус задачи (status == "running", если вышел таймаут).
+    """
+    proxmox = get_proxmox_api(PROXMOX)
+    deadline = time.monotonic() + (timeout or PROXMOX.task_timeout)
+    delay = TASK_POLL_START
+
+    while True:
+        status = await proxmox.nodes(node).tasks(upid).status.get()
+        if status.get("status") != "running":
+            return status
+
+        if time.monotonic() + delay > deadline:
+            logger.warning(f"Задача {upid} не завершилась за отведённое время")
+            return status
+
+        await asyncio.sleep(delay)
+        delay = min(delay * 1.5, TASK_POLL_MAX)
+
+
+def describe_task(status):
+    """Короткое описание итога задачи для сообщения в Telegram."""
+    if status.get("status") == "running":
+        return "⏳ Задача ещё выполняется"
+
+    exitstatus = status.get("exitstatus", "unknown")
+    if exitstatus == "OK":
+        return "✅ Задача завершена успешно"
+    return f"❌ Задача завершилась с ошибкой: {exitstatus}"
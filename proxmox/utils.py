@@ -18,21 +18,3 @@ def format_uptime(seconds: int) -> str:
     if h:
         return f"{h}ч {m}м"
     return f"{m}м"
-
-
-def find_node_by_vmid(proxmox, vmid, resource_type="qemu"):
-    try:
-        for node in proxmox.nodes.get():
-            node_name = node["node"]
-            resources = (
-                proxmox.nodes(node_name).qemu.get()
-                if resource_type == "qemu"
-                else proxmox.nodes(node_name).lxc.get()
-            )
-            for res in resources:
-                if int(res["vmid"]) == int(vmid):
-                    return node_name
-        raise ValueError(f"Ресурс {vmid} не найден")
-    except Exception as e:
-        logger.error(f"Ошибка поиска узла: {e}")
-        raise Exception(f"Ошибка поиска узла: {e}")
@@ -1,124 +1,141 @@
 import re
+import asyncio
 import logging
 import time
+from functools import partial
 
+from core.singleflight import single_flight
 from proxmox.client import get_proxmox_api, retry_proxmox_call
-from proxmox.utils import _human_gb, find_node_by_vmid
-from config import PROXMOX
+from proxmox.inventory import (
+    build_guest_entry,
+    get_cluster_guests,
+    run_on_guest_node,
+)
+from config import PROXMOX, TERMINAL
 
 logger = logging.getLogger(__name__)
 
+EXEC_POLL_START = 0.005
+EXEC_POLL_MAX = 1.0
+
+
+async def _disk_size_from_config(proxmox, node, vmid):
+    """Суммирует размеры дисков из конфига VM (size=32G, size=512M)."""
+    total_gb = 0.0
+    config = await proxmox.nodes(node).qemu(vmid).config.get()
+    for val in config.values():
+        if isinstance(val, str):
+            m = re.search(r"size=(\d+)([GM]?)B?", val, re.I)
+            if m:
+                size = int(m.group(1))
+                unit = m.group(2).upper()
+                if not unit or unit == "G":
+                    total_gb += size
+                elif unit == "M":
+                    total_gb += size / 1024
+    return round(total_gb, 1)
+
 
 @retry_proxmox_call(max_retries=3)
-def get_vm_list():
+async def get_vm_list():
+    """
+    Список VM из одного запроса /cluster/resources. Размер диска, которого
+    в нём нет, дозапрашивается из конфига только на экране деталей (get_vm).
+    """
     proxmox = get_proxmox_api(PROXMOX)
     vms = []
-    try:
-        for node in proxmox.nodes.get():
-            node_name = node["node"]
-            for vm in proxmox.nodes(node_name).qemu.get():
-
-                if vm.get("template") == 1:
-                    continue
-
-                vmid = int(vm["vmid"])
-                try:
-                    status = proxmox.nodes(node_name).qemu(vmid).status.current.get()
-
-                    uptime = int(status.get("uptime", 0))
-                    cpu = round(float(status.get("cpu", 0)) * 100, 1)
-                    mem_used = int(status.get("mem", 0)) // 1024 // 1024
-                    mem_total = int(status.get("maxmem", 1)) // 1024 // 1024
-                    mem_pct = round(mem_used / mem_total * 100, 1) if mem_total else 0
-
-                    used_gb = _human_gb(status.get("disk", 0))
-                    total_gb = _human_gb(status.get("maxdisk", 0))
-
-                    if total_gb == 0:
-                        config = proxmox.nodes(node_name).qemu(vmid).config.get()
-                        for val in config.values():
-                            if isinstance(val, str):
-                                m = re.search(r"size=(\d+)([GM]?)B?", val, re.I)
-                                if m:
-                                    size = int(m.group(1))
-                                    unit = m.group(2).upper()
-                                    if not unit or unit == "G":
-                                        total_gb += size
-                                    elif unit == "M":
-                                        total_gb += size / 1024
-
-                    vms.append(
-                        {
-                            "id": vmid,
-                            "name": vm.get("name", f"VM{vmid}"),
-                            "status": vm.get("status", "unknown"),
-                            "node": node_name,
-                            "uptime": uptime,
-                            "cpu_usage_percent": cpu,
-                            "mem_used_mb": mem_used,
-                            "mem_total_mb": mem_total,
-                            "mem_usage_percent": mem_pct,
-                            "disk_used_gb": used_gb if used_gb > 0 else 0.0,
-                            "disk_total_gb": round(total_gb, 1),
-                        }
-                    )
-                except Exception as e:
-                    logger.error(f"[VM {vmid}] ошибка получения данных: {e}")
-                    vms.append(
-                        {
-                            "id": vmid,
-                            "name": "Ошибка",
-                            "status": "error",
-                            "node": node_name,
-                            "uptime": 0,
-                            "cpu_usage_percent": 0,
-                            "mem_used_mb": 0,
-                            "mem_total_mb": 0,
-                            "mem_usage_percent": 0,
-                            "disk_used_gb": 0.0,
-                            "disk_total_gb": 0.0,
-                        }
-                    )
-    except Exception as e:
-        logger.error(f"Ошибка получения списка VM: {e}")
+    for res in await get_cluster_guests(proxmox, "qemu"):
+        if res.get("template") == 1:
+            continue
+        vms.append(build_guest_entry(res, "VM"))
     return vms
 
 
-def vm_action(vmid, action, node=None):
+@retry_proxmox_call(max_retries=3)
+async def get_vm(vmid, node):
+    """Данные одной VM в том же формате, что и get_vm_list (1–2 запроса к API)."""
     proxmox = get_proxmox_api(PROXMOX)
+    return await run_on_guest_node(
+        proxmox, vmid, "qemu", node, partial(_get_vm_on_node, proxmox, vmid)
+    )
+
+
+async def _get_vm_on_node(proxmox, vmid, node):
+    status = await proxmox.nodes(node).qemu(vmid).status.current.get()
+    vm = build_guest_entry({**status, "vmid": vmid, "node": node}, "VM")
 
-    if node is None:
-        node = find_node_by_vmid(proxmox, vmid, "qemu")
+    if vm["disk_total_gb"] == 0:
+        vm["disk_total_gb"] = await _disk_size_from_config(proxmox, node, vmid)
+    return vm
 
+
+@single_flight("rrd")
+@retry_proxmox_call(max_retries=3)
+async def get_vm_rrd(vmid, node, timeframe):
+    """Точки RRD (средние) VM за timeframe: hour, day или week."""
+    proxmox = get_proxmox_api(PROXMOX)
+    return await run_on_guest_node(
+        proxmox,
+        vmid,
+        "qemu",
+        node,
+        lambda n: proxmox.nodes(n)
+        .qemu(vmid)
+        .rrddata.get(timeframe=timeframe, cf="AVERAGE"),
+    )
+
+
+async def vm_action(vmid, action, node=None):
+    proxmox = get_proxmox_api(PROXMOX)
+    return await run_on_guest_node(
+        proxmox, vmid, "qemu", node, partial(_vm_action_on_node, proxmox, vmid, action)
+    )
+
+
+async def _vm_action_on_node(proxmox, vmid, action, node):
     if not node:
         raise ValueError(f"Виртуальная машина с ID {vmid} не найдена.")
 
     try:
         if action == "start":
-            proxmox.nodes(node).qemu(vmid).status.start.post()
-            return "Запущена"
+            upid = await proxmox.nodes(node).qemu(vmid).status.start.post()
+            return {"message": "Запущена", "node": node, "upid": upid}
 
         elif action == "stop":
             try:
-                proxmox.nodes(node).qemu(vmid).status.shutdown.post(timeout=30)
-                return "Выключается..."
+                upid = (
+                    await proxmox.nodes(node)
+                    .qemu(vmid)
+                    .status.shutdown.post(timeout=30)
+                )
+                return {"message": "Выключается...", "node": node, "upid": upid}
             except Exception as e:
                 logger.warning(
                     f"Мягкое выключение VM {vmid} не удалось ({e}), принудительная остановка."
                 )
-                proxmox.nodes(node).qemu(vmid).status.stop.post()
-                return "Принудительно остановлена"
+                upid = await proxmox.nodes(node).qemu(vmid).status.stop.post()
+                return {
+                    "message": "Принудительно остановлена",
+                    "node": node,
+                    "upid": upid,
+                }
 
         elif action == "reboot":
             try:
-                proxmox.nodes(node).qemu(vmid).status.reboot.post(timeout=30)
-                return "Перезагружается..."
+                upid = (
+                    await proxmox.nodes(node).qemu(vmid).status.reboot.post(timeout=30)
+                )
+                return {"message": "Перезагружается...", "node": node, "upid": upid}
             except Exception as e:
                 logger.warning(
                     f"Мягкая перезагрузка VM {vmid} не удалась ({e}), принудительный сброс."
                 )
-                proxmox.nodes(node).qemu(vmid).status.reset.post()
-                return "Принудительно перезагружена"
+                upid = await proxmox.nodes(node).qemu(vmid).status.reset.post()
+                return {
+                    "message": "Принудительно перезагружена",
+                    "node": node,
+                    "upid": upid,
+                }
 
         else:
             raise ValueError(f"Неизвестное действие: {action}")
@@ -127,18 +144,24 @@ def vm_action(vmid, action, node=None):
         raise Exception(f"Ошибка {action} VM {vmid}: {e}")
 
 
-def execute_vm_command(vmid, node, command):
+async def execute_vm_command(vmid, node, command, timeout=None):
+    """
+    Выполняет команду через QEMU Guest Agent и ждёт результат.
+    exec-status опрашивается с экспоненциально растущим интервалом (от 5 мс до 1 с),
+    поэтому быстрые команды возвращаются почти сразу. Если команда не уложилась
+    в timeout (по умолчанию TERMINAL_EXEC_TIMEOUT), возвращается то, что агент
+    успел отдать, с пометкой, что процесс ещё работает.
+    """
     proxmox = get_proxmox_api(PROXMOX)
+    agent = proxmox.nodes(node).qemu(vmid).agent
     try:
-        res = (
-            proxmox.nodes(node)
-            .qemu(vmid)
-            .agent.exec.post(command=["bash", "-c", command])
-        )
+        res = await agent.exec.post(command=["bash", "-c", command])
         pid = res.get("pid")
 
-        for _ in range(15):
-            status = proxmox.nodes(node).qemu(vmid).agent("exec-status").get(pid=pid)
+        deadline = time.monotonic() + (timeout or TERMINAL.exec_timeout)
+        delay = EXEC_POLL_START
+        while True:
+            status = await agent("exec-status").get(pid=pid)
             if status.get("exited") == 1:
                 out = status.get("out-data", "")
                 err = status.get("err-data", "")
@@ -147,9 +170,19 @@ def execute_vm_command(vmid, node, command):
                     if out
                     else (err if err else "✅ Команда выполнена (без вывода)")
                 )
-            time.sleep(1)
 
-        return "⏳ Превышено время ожидания ответа от команды."
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * 2, EXEC_POLL_MAX)
+
+        partial_output = status.get("out-data", "") or status.get("err-data", "")
+        note = (
+            f"⏳ Команда всё ещё выполняется (PID {pid} в гостевой ОС), "
+            f"ожидание прервано через {timeout or TERMINAL.exec_timeout}с."
+        )
+        return f"{partial_output}\n{note}" if partial_output else note
 
     except Exception as e:
         error_msg = str(e).lower()
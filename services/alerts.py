@@ -1,17 +1,85 @@
 import asyncio
+import html
+import time
 import logging
+from functools import partial
+from telegram import ReplyParameters
 from telegram.ext import Application
-from system.checks import check_cpu_temp, check_cpu_usage, check_ram_usage
-from config import TELEGRAM, ALERTS
+from proxmox.client import get_proxmox_api
+from proxmox.inventory import get_cluster_snapshot
+from proxmox.utils import format_uptime
+from services.guest_rules import GuestRules
+from services.rules import AlertRule, RuleEngine
+from system.collector import host_collector
+from core.dispatcher import MESSAGE_LIMIT
+from config import TELEGRAM, ALERTS, PROXMOX, HISTORY
 
 logger = logging.getLogger(__name__)
 
 
+def build_host_rules():
+    """Правила для хоста бота; порог снятия алерта ниже порога срабатывания на ALERT_HYSTERESIS."""
+    return [
+        AlertRule(
+            key="cpu_temp",
+            metric="temp",
+            title="Перегрев CPU",
+            emoji="🔥",
+            unit="°C",
+            threshold=ALERTS.cpu_temp_threshold,
+            clear_below=ALERTS.cpu_temp_threshold - ALERTS.hysteresis,
+            sustain=ALERTS.sustain,
+        ),
+        AlertRule(
+            key="cpu_usage",
+            metric="cpu",
+            title="Высокая нагрузка CPU",
+            emoji="⚡",
+            unit="%",
+            threshold=ALERTS.cpu_usage_threshold,
+            clear_below=ALERTS.cpu_usage_threshold - ALERTS.hysteresis,
+            sustain=ALERTS.sustain,
+        ),
+        AlertRule(
+            key="ram_usage",
+            metric="ram",
+            title="Много памяти занято",
+            emoji="💾",
+            unit="%",
+            threshold=ALERTS.ram_usage_threshold,
+            clear_below=ALERTS.ram_usage_threshold - ALERTS.hysteresis,
+            sustain=ALERTS.sustain,
+        ),
+    ]
+
+
+def _alert_title(state) -> str:
+    if state.label:
+        return f"{state.label}: {state.rule.title}"
+    return state.rule.title
+
+
 class AlertManager:
     def __init__(self, application: Application):
         self.app = application
         self.running = False
         self.task = None
+        self.engine = RuleEngine()
+        self.rules = build_host_rules()
+        self.guest_rules = GuestRules(
+            defaults={
+                "cpu": ALERTS.guest_cpu_threshold,
+                "mem": ALERTS.guest_mem_threshold,
+                "disk": ALERTS.guest_disk_threshold,
+            },
+            overrides=ALERTS.guest_overrides,
+            hysteresis=ALERTS.hysteresis,
+            sustain=ALERTS.sustain,
+        )
+
+    @property
+    def dispatcher(self):
+        return self.app.bot_data["dispatcher"]
 
     async def start(self):
         self.running = True
@@ -41,46 +109,198 @@ class AlertManager:
                 logger.error(f"❌ Ошибка в мониторинге: {e}")
                 await asyncio.sleep(error_sleep)
 
-    async def _run_check(self, check_func):
-        """Запускает синхронную проверку в потоке, чтобы не блокировать бота"""
-        return await asyncio.to_thread(check_func)
-
     async def _check_alerts(self):
-        try:
-            alert, value = await self._run_check(check_cpu_temp)
-            if alert:
-                await self._send_alert(
-                    f"🔥 <b>ПЕРЕГРЕВ!</b> Температура CPU: {value}°C (порог: {ALERTS.cpu_temp_threshold}°C)"
-                )
+        # Свежий замер сборщика истории; новый снимается, только если он отстал
+        sample = await host_collector.snapshot(max_age=HISTORY.sample_interval)
+        events = []
+
+        for rule in self.rules:
+            value = sample.get(rule.metric)
+            if value is None:
+                continue
+
+            event, state = self.engine.evaluate(rule, "host", round(value, 1))
+            if event:
+                events.append((event, state))
             else:
-                logger.debug(f"✅ Температура в норме: {value}°C")
-        except Exception as e:
-            logger.error(f"❌ Ошибка проверки температуры: {e}")
+                logger.debug(f"✅ {rule.title}: {value}{rule.unit}")
 
-        try:
-            alert, value = await self._run_check(check_cpu_usage)
-            if alert:
-                await self._send_alert(
-                    f"⚡ <b>ВЫСОКАЯ НАГРУЗКА!</b> CPU: {value}% (порог: {ALERTS.cpu_usage_threshold}%)"
-                )
-        except Exception as e:
-            logger.error(f"❌ Ошибка проверки CPU: {e}")
+        if self.guest_rules.enabled:
+            events.extend(await self._check_guest_alerts())
 
-        try:
-            alert, value = await self._run_check(check_ram_usage)
-            if alert:
-                await self._send_alert(
-                    f"💾 <b>МНОГО ПАМЯТИ!</b> RAM: {value}% (порог: {ALERTS.ram_usage_threshold}%)"
-                )
-        except Exception as e:
-            logger.error(f"❌ Ошибка проверки RAM: {e}")
+        if events:
+            self._publish(events)
 
-    async def _send_alert(self, text: str):
+    async def _check_guest_alerts(self):
+        """Все гости проверяются по одному снимку /cluster/resources за такт."""
         try:
-            for chat_id in TELEGRAM.whitelist:
-                await self.app.bot.send_message(
-                    chat_id=chat_id, text=text, parse_mode="HTML"
-                )
-            logger.info(f"📢 Отправлен алерт: {text}")
+            resources = await get_cluster_snapshot(get_proxmox_api(PROXMOX))
         except Exception as e:
-            logger.error(f"❌ Ошибка отправки алерта: {e}")
+            logger.error(f"❌ Не удалось получить гостей для алертов: {e}")
+            return []
+
+        return self.guest_rules.evaluate(self.engine, resources)
+
+    def _format_alert(self, event, state) -> str:
+        rule = state.rule
+        elapsed = int(time.time() - state.since)
+        duration = format_uptime(elapsed) if elapsed >= 60 else "меньше минуты"
+        title = _alert_title(state)
+
+        if event == "resolved":
+            return (
+                f"✅ <b>{html.escape(title)}: норма</b>\n"
+                f"Сейчас: {state.value}{rule.unit}, пик {state.peak}{rule.unit}, "
+                f"длилось {duration}"
+            )
+
+        return (
+            f"{rule.emoji} <b>{html.escape(title.upper())}!</b> {state.value}{rule.unit} "
+            f"(порог: {rule.threshold}{rule.unit})\n"
+            f"Длится: {duration}, пик {state.peak}{rule.unit}"
+        )
+
+    def _publish(self, events):
+        """
+        Ставит события одной проверки в очереди диспетчера и не ждёт доставки:
+        id отправленных сообщений приходят в колбэках. Если сработало больше
+        ALERT_DIGEST_THRESHOLD алертов, они уходят одной сводкой.
+        """
+        fired = [state for event, state in events if event == "fired"]
+
+        if ALERTS.digest_threshold and len(fired) > ALERTS.digest_threshold:
+            self._send_digest(fired)
+        else:
+            for state in fired:
+                self._send_alert(state)
+
+        now = time.time()
+        for event, state in events:
+            if event == "resolved" or (
+                event == "updated" and self._should_update(state, now)
+            ):
+                self._update_alert(event, state)
+
+    def _value_bucket(self, state) -> int:
+        return int(state.value // max(ALERTS.hysteresis, 1))
+
+    def _should_update(self, state, now) -> bool:
+        """
+        Открытый алерт правится, только если значение ушло в другую полосу
+        шириной ALERT_HYSTERESIS, и не чаще раза в ALERT_UPDATE_INTERVAL:
+        правки расходуют лимит сообщений чата наравне с новыми алертами.
+        """
+        if not state.messages or self._value_bucket(state) == state.shown_bucket:
+            return False
+        return now - state.edited_at >= ALERTS.update_interval
+
+    def _send_alert(self, state):
+        """
+        Одно сообщение на алерт: при срабатывании оно отправляется, пока алерт
+        держится — правится на месте, при восстановлении правится последний раз
+        и получает ответ о восстановлении (правки уведомлений не создают).
+        """
+        text = self._format_alert("fired", state)
+        state.shown_bucket = self._value_bucket(state)
+        state.edited_at = time.time()
+
+        for chat_id in TELEGRAM.whitelist:
+            state.pending.add(chat_id)
+            future = self.dispatcher.submit(
+                chat_id, "send_message", text=text, parse_mode="HTML"
+            )
+            future.add_done_callback(partial(self._alert_sent, state, chat_id))
+        logger.info(f"📢 Алерт сработал: {_alert_title(state)} ({state.value})")
+
+    def _alert_sent(self, state, chat_id, future):
+        state.pending.discard(chat_id)
+        if future.cancelled():
+            return
+        if future.exception():
+            logger.error(
+                f"❌ Не удалось отправить алерт в {chat_id}: {future.exception()}"
+            )
+        else:
+            state.messages[chat_id] = future.result().message_id
+
+        # Алерт успел сняться, пока сообщение стояло в очереди
+        if state.status == "resolved":
+            self._resolve_in_chat(state, chat_id, self._format_alert("resolved", state))
+
+    def _send_digest(self, states):
+        """Сводка вместо пачки сообщений; такие алерты не правятся на месте."""
+        header = f"🚨 <b>Сработало алертов: {len(states)}</b>\n"
+        lines = []
+        size = len(header)
+
+        for i, state in enumerate(states):
+            rule = state.rule
+            line = (
+                f"{rule.emoji} {html.escape(_alert_title(state))}: "
+                f"{state.value}{rule.unit} (порог: {rule.threshold}{rule.unit})"
+            )
+            if size + len(line) + 40 > MESSAGE_LIMIT:
+                lines.append(f"…и ещё {len(states) - i}")
+                break
+            lines.append(line)
+            size += len(line) + 1
+
+        text = header + "\n".join(lines)
+        for chat_id in TELEGRAM.whitelist:
+            future = self.dispatcher.submit(
+                chat_id, "send_message", text=text, parse_mode="HTML"
+            )
+            future.add_done_callback(partial(self._log_failure, "сводку", chat_id))
+        logger.info(f"📢 Сводка алертов: {len(states)}")
+
+    def _update_alert(self, event, state):
+        text = self._format_alert(event, state)
+        title = _alert_title(state)
+        state.shown_bucket = self._value_bucket(state)
+        state.edited_at = time.time()
+
+        if event != "resolved":
+            for chat_id, message_id in state.messages.items():
+                self._edit_alert(chat_id, message_id, text)
+            return
+
+        for chat_id in TELEGRAM.whitelist:
+            # Куда сообщение ещё не ушло, снятие доставит колбэк отправки
+            if chat_id not in state.pending:
+                self._resolve_in_chat(state, chat_id, text)
+        logger.info(f"📢 Алерт снят: {title} ({state.value})")
+
+    def _resolve_in_chat(self, state, chat_id, text):
+        message_id = state.messages.get(chat_id)
+        if not message_id:
+            # Алерт пришёл в сводке или не отправился: править нечего
+            self.dispatcher.notify(chat_id, text, parse_mode="HTML")
+            return
+
+        self._edit_alert(chat_id, message_id, text)
+        self.dispatcher.notify(
+            chat_id,
+            f"✅ {html.escape(_alert_title(state))}: снова в норме",
+            parse_mode="HTML",
+            reply_parameters=ReplyParameters(
+                message_id=message_id, allow_sending_without_reply=True
+            ),
+        )
+
+    def _edit_alert(self, chat_id, message_id, text):
+        future = self.dispatcher.submit(
+            chat_id,
+            "edit_message_text",
+            message_id=message_id,
+            text=text,
+            parse_mode="HTML",
+        )
+        future.add_done_callback(partial(self._log_failure, "алерт", chat_id))
+
+    @staticmethod
+    def _log_failure(what, chat_id, future):
+        if future.cancelled() or not future.exception():
+            return
+        error = future.exception()
+        if "not modified" not in str(error).lower():
+            logger.warning(f"Не удалось доставить {what} в {chat_id}: {error}")
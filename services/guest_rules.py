@@ -0,0 +1,154 @@
+import math
+import re
+import logging
+
+from services.rules import AlertRule
+
+logger = logging.getLogger(__name__)
+
+# Метрика -> (название, эмодзи)
+GUEST_METRICS = {
+    "cpu": ("CPU", "⚡"),
+    "mem": ("RAM", "🧠"),
+    "disk": ("Диск", "💾"),
+}
+
+_IDLE_SAMPLE = dict.fromkeys(GUEST_METRICS, 0.0)
+
+
+def parse_overrides(raw: str):
+    """
+    Разбирает GUEST_ALERT_OVERRIDES вида "101:cpu=95,disk=80;tag=db:mem=95".
+    Возвращает (пороги по vmid, пороги по тегу). Порог 0 отключает метрику.
+    """
+    by_vmid, by_tag = {}, {}
+
+    for entry in filter(None, (e.strip() for e in raw.split(";"))):
+        selector, _, spec = entry.partition(":")
+        limits = {}
+        for part in filter(None, (p.strip() for p in spec.split(","))):
+            metric, _, value = part.partition("=")
+            try:
+                if metric.strip() not in GUEST_METRICS:
+                    raise ValueError(f"неизвестная метрика {metric!r}")
+                limits[metric.strip()] = float(value)
+            except ValueError as e:
+                logger.warning(f"Пропущен порог {part!r} в GUEST_ALERT_OVERRIDES: {e}")
+
+        selector = selector.strip()
+        if selector.startswith("tag="):
+            by_tag[selector[4:]] = limits
+        elif selector.isdigit():
+            by_vmid[int(selector)] = limits
+        else:
+            logger.warning(f"Пропущен селектор {selector!r} в GUEST_ALERT_OVERRIDES")
+
+    return by_vmid, by_tag
+
+
+def guest_sample(res):
+    """CPU, RAM и диск гостя в процентах из записи /cluster/resources."""
+    if res.get("status") != "running":
+        return _IDLE_SAMPLE
+
+    maxmem = res.get("maxmem") or 0
+    maxdisk = res.get("maxdisk") or 0
+    return {
+        "cpu": float(res.get("cpu") or 0) * 100,
+        "mem": (res.get("mem") or 0) / maxmem * 100 if maxmem else 0.0,
+        # Для VM Proxmox отдаёт disk=0, поэтому правило по диску работает для LXC
+        "disk": (res.get("disk") or 0) / maxdisk * 100 if maxdisk else 0.0,
+    }
+
+
+class GuestRules:
+    """
+    Пороги по гостям: общие, переопределённые по тегу и по vmid (vmid важнее тега).
+    Все гости проверяются за один проход по снимку /cluster/resources без
+    запросов к API по отдельным гостям; в RuleEngine попадают только значения
+    выше порога и объекты, по которым алерт уже открыт.
+    """
+
+    def __init__(self, defaults: dict, overrides: str, hysteresis: int, sustain: int):
+        self.defaults = defaults
+        self.by_vmid, self.by_tag = parse_overrides(overrides)
+        self.hysteresis = hysteresis
+        self.sustain = sustain
+        self._rules = {}
+
+    @property
+    def enabled(self) -> bool:
+        return any(self.defaults.values()) or bool(self.by_vmid or self.by_tag)
+
+    def limits(self, vmid: int, tags: str):
+        if vmid not in self.by_vmid and not (self.by_tag and tags):
+            return self.defaults
+
+        limits = dict(self.defaults)
+        for tag in re.split(r"[;,\s]+", tags):
+            limits.update(self.by_tag.get(tag, ()))
+        limits.update(self.by_vmid.get(vmid, ()))
+        return limits
+
+    def rule(self, metric: str, threshold: float) -> AlertRule:
+        key = (metric, threshold)
+        rule = self._rules.get(key)
+        if rule is None:
+            title, emoji = GUEST_METRICS[metric]
+            # Отключённый порог: алерт не откроется, а открытый снимется
+            limit = threshold or math.inf
+            rule = AlertRule(
+                key=f"guest_{metric}",
+                metric=metric,
+                title=title,
+                emoji=emoji,
+                unit="%",
+                threshold=limit,
+                clear_below=limit - self.hysteresis,
+                sustain=self.sustain,
+            )
+            self._rules[key] = rule
+        return rule
+
+    def evaluate(self, engine, resources, now=None):
+        """Возвращает список (событие, состояние) по всем гостям снимка."""
+        events = []
+        present = set()
+        open_states = engine.states
+
+        for res in resources:
+            if res.get("template"):
+                continue
+
+            vmid = int(res["vmid"])
+            subject = str(vmid)
+            present.add(subject)
+            limits = self.limits(vmid, res.get("tags") or "")
+            sample = guest_sample(res)
+
+            for metric, value in sample.items():
+                threshold = limits.get(metric, 0)
+                if (not threshold or value <= threshold) and (
+                    f"guest_{metric}",
+                    subject,
+                ) not in open_states:
+                    continue
+
+                label = (
+                    f"{'VM' if res.get('type') == 'qemu' else 'LXC'} {vmid} "
+                    f"({res.get('name', vmid)})"
+                )
+                event, state = engine.evaluate(
+                    self.rule(metric, threshold), subject, round(value, 1), now, label
+                )
+                if event:
+                    events.append((event, state))
+
+        # Гости, пропавшие из кластера, закрывают свои алерты
+        for (key, subject), state in list(open_states.items()):
+            if key.startswith("guest_") and subject not in present:
+                event, state = engine.evaluate(state.rule, subject, 0.0, now)
+                if event:
+                    events.append((event, state))
+
+        return events
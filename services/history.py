@@ -0,0 +1,46 @@
+import asyncio
+import logging
+
+from config import HISTORY
+from system.history import host_history
+from system.collector import host_collector
+
+logger = logging.getLogger(__name__)
+
+
+class HistorySampler:
+    """
+    Раз в HISTORY_SAMPLE_INTERVAL секунд снимает замер host_collector и пишет
+    его в историю метрик. Этот же замер читают алерты и /status.
+    """
+
+    def __init__(self):
+        self.running = False
+        self.task = None
+
+    async def start(self):
+        self.running = True
+        self.task = asyncio.create_task(self._sample_loop())
+        logger.info("📈 Сбор истории метрик запущен")
+
+    async def stop(self):
+        self.running = False
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        logger.info("Сбор истории метрик остановлен")
+
+    async def _sample_loop(self):
+        while self.running:
+            try:
+                sample = await asyncio.to_thread(host_collector.sample)
+                host_history.add(sample, ts=sample["at"])
+                await asyncio.sleep(HISTORY.sample_interval)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"❌ Ошибка сбора истории метрик: {e}")
+                await asyncio.sleep(HISTORY.sample_interval)
@@ -0,0 +1,95 @@
+import time
+import logging
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class AlertRule:
+    """
+    Правило алерта: срабатывает, когда metric держится выше threshold не меньше
+    sustain секунд, и снимается, когда значение опускается ниже clear_below.
+    Полоса между clear_below и threshold (гистерезис) не даёт алерту мигать.
+    """
+
+    key: str
+    metric: str
+    title: str
+    emoji: str
+    unit: str
+    threshold: float
+    clear_below: float
+    sustain: int = 0
+
+
+@dataclass
+class AlertState:
+    rule: AlertRule
+    subject: str
+    label: str = ""
+    status: str = "pending"
+    since: float = 0.0
+    fired_at: float = 0.0
+    value: float = 0.0
+    peak: float = 0.0
+    # chat_id -> message_id сообщения об алерте, которое правится на месте
+    messages: dict = field(default_factory=dict)
+    # Чаты, куда сообщение об алерте ещё отправляется
+    pending: set = field(default_factory=set)
+    # Что и когда последний раз показано в сообщении (для редких правок)
+    shown_bucket: int | None = None
+    edited_at: float = 0.0
+
+
+class RuleEngine:
+    """
+    Хранит состояние алертов по (правило, объект) и превращает поток замеров
+    в события: "fired" (начало), "updated" (алерт продолжается) и "resolved".
+    Объекты в норме состояния не занимают.
+    """
+
+    def __init__(self):
+        self.states = {}
+
+    def evaluate(
+        self, rule: AlertRule, subject: str, value: float, now=None, label: str = ""
+    ):
+        """
+        Возвращает (событие, состояние) или (None, None), если сообщать нечего.
+        label — подпись объекта в сообщении (например, "VM 101 (web)").
+        """
+        now = time.time() if now is None else now
+        key = (rule.key, subject)
+        state = self.states.get(key)
+
+        if state is None:
+            if value <= rule.threshold:
+                return None, None
+            state = AlertState(
+                rule, subject, label=label, since=now, value=value, peak=value
+            )
+            self.states[key] = state
+
+        state.rule = rule
+        state.value = value
+        state.peak = max(state.peak, value)
+
+        if state.status == "pending":
+            if value <= rule.threshold:
+                del self.states[key]
+                return None, None
+            if now - state.since < rule.sustain:
+                return None, None
+            state.status = "firing"
+            state.fired_at = now
+            return "fired", state
+
+        if value < rule.clear_below:
+            state.status = "resolved"
+            del self.states[key]
+            return "resolved", state
+        return "updated", state
+
+    def firing(self):
+        return [s for s in self.states.values() if s.status == "firing"]
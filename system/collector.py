@@ -0,0 +1,85 @@
+import asyncio
+import os
+import time
+import logging
+import threading
+
+import psutil
+
+from system.sensors import get_temp, pick_cpu_temp
+
+logger = logging.getLogger(__name__)
+
+# На Linux guest/guest_nice уже учтены в user/nice
+_GUEST_FIELDS = ("guest", "guest_nice")
+_IDLE_FIELDS = ("idle", "iowait")
+
+
+def _cpu_busy_percent(prev, cur) -> float | None:
+    """Загрузка CPU между двумя снимками cpu_times, None если интервал пустой."""
+    fields = [f for f in cur._fields if f not in _GUEST_FIELDS]
+    total = sum(max(getattr(cur, f) - getattr(prev, f), 0.0) for f in fields)
+    if total <= 0:
+        return None
+
+    idle = sum(
+        max(getattr(cur, f) - getattr(prev, f), 0.0)
+        for f in _IDLE_FIELDS
+        if f in fields
+    )
+    return round(min(max((total - idle) / total * 100, 0.0), 100.0), 1)
+
+
+class HostCollector:
+    """
+    Единый замер хоста для алертов, /status и истории метрик.
+
+    CPU считается по разнице cpu_times от предыдущего замера этого же
+    коллектора, поэтому посторонние вызовы psutil.cpu_percent() на результат
+    не влияют. Последний замер хранится в latest и раздаётся всем потребителям.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._prev_times = psutil.cpu_times()
+        self.latest = None
+
+    def sample(self) -> dict:
+        """Снимает новый замер (синхронно: psutil и чтение датчиков)."""
+        with self._lock:
+            times = psutil.cpu_times()
+            cpu = _cpu_busy_percent(self._prev_times, times)
+            if cpu is None:
+                # Замеры почти одновременно: разница пустая, берём прошлое значение
+                cpu = self.latest["cpu"] if self.latest else 0.0
+            else:
+                self._prev_times = times
+
+            mem = psutil.virtual_memory()
+            temps = get_temp()
+            try:
+                load = os.getloadavg()
+            except (AttributeError, OSError):
+                load = None
+
+            self.latest = {
+                "at": time.time(),
+                "cpu": cpu,
+                "ram": mem.percent,
+                "ram_used": mem.used,
+                "ram_total": mem.total,
+                "load": load,
+                "temps": temps,
+                "temp": pick_cpu_temp(temps),
+            }
+            return self.latest
+
+    async def snapshot(self, max_age: float = 0) -> dict:
+        """Последний замер, если он моложе max_age секунд, иначе новый."""
+        latest = self.latest
+        if latest and time.time() - latest["at"] < max_age:
+            return latest
+        return await asyncio.to_thread(self.sample)
+
+
+host_collector = HostCollector()
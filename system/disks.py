@@ -0,0 +1,163 @@
+import asyncio
+import os
+import re
+import select
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+MOUNTINFO = "/proc/self/mountinfo"
+IGNORE_FSTYPES = {"", "squashfs", "tmpfs", "devtmpfs", "overlay", "iso9660", "vfat"}
+# Сетевые ФС помечены в /proc/filesystems как nodev, но в /status они нужны
+NETWORK_FSTYPES = {"nfs", "nfs4", "cifs", "smb3", "ceph", "glusterfs", "fuse.sshfs"}
+EXTRA_FSTYPES = {"zfs"} | NETWORK_FSTYPES
+
+_OCTAL_ESCAPE = re.compile(r"\\([0-7]{3})")
+
+
+def _unescape(path: str) -> str:
+    return _OCTAL_ESCAPE.sub(lambda m: chr(int(m.group(1), 8)), path)
+
+
+def _device_fstypes():
+    """Файловые системы на блочных устройствах (без пометки nodev)."""
+    try:
+        with open("/proc/filesystems") as f:
+            return {
+                line.split()[-1]
+                for line in f
+                if line.strip() and not line.startswith("nodev")
+            }
+    except OSError:
+        return set()
+
+
+def parse_mountinfo(text: str, fstypes: set):
+    """Точки монтирования из mountinfo, которые стоит показывать в /status."""
+    mounts = []
+    seen = set()
+
+    for line in text.splitlines():
+        fields = line.split()
+        try:
+            sep = fields.index("-")
+            mountpoint = _unescape(fields[4])
+            fstype = fields[sep + 1]
+        except (ValueError, IndexError):
+            continue
+
+        if fstype in IGNORE_FSTYPES or fstype not in fstypes:
+            continue
+        if mountpoint.startswith("/boot") or mountpoint in seen:
+            continue
+        seen.add(mountpoint)
+        mounts.append(mountpoint)
+
+    return mounts
+
+
+class MountTable:
+    """
+    Кэш списка точек монтирования. На Linux ядро отмечает /proc/self/mountinfo
+    событием POLLPRI при любом mount/umount, поэтому файл перечитывается только
+    после изменений; в остальное время проверка — один poll() без ожидания.
+    """
+
+    def __init__(self, path: str = MOUNTINFO):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+        self._poll = None
+        self._mounts = None
+
+    def mounts(self):
+        with self._lock:
+            if self._mounts is None or self._changed():
+                self._mounts = self._load()
+            return self._mounts
+
+    def _changed(self) -> bool:
+        if self._poll is None:
+            # Без mountinfo (не Linux) следить не за чем — читаем каждый раз
+            return True
+        return bool(self._poll.poll(0))
+
+    def _load(self):
+        if self._file is None and os.path.exists(self.path):
+            self._file = open(self.path)
+            self._poll = select.poll()
+            self._poll.register(self._file, select.POLLPRI | select.POLLERR)
+
+        if self._file is None:
+            return [
+                part.mountpoint
+                for part in psutil.disk_partitions(all=False)
+                if part.fstype not in IGNORE_FSTYPES
+                and not part.mountpoint.startswith("/boot")
+            ]
+
+        # Чтение с начала сбрасывает событие POLLPRI
+        self._file.seek(0)
+        mounts = parse_mountinfo(self._file.read(), _device_fstypes() | EXTRA_FSTYPES)
+        logger.debug(f"Список точек монтирования обновлён: {len(mounts)}")
+        return mounts
+
+
+class DiskProbe:
+    """
+    Заполненность дисков. statvfs выполняется параллельно в отдельном пуле
+    потоков с таймаутом на каждую точку: зависшая NFS/CIFS показывается как
+    "timeout" и не держит ни /status, ни общий executor. Пока прошлый вызов
+    по зависшей точке не вернулся, новый поток на неё не тратится.
+    """
+
+    def __init__(self, mount_table: MountTable, workers: int = 8):
+        self.mount_table = mount_table
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="statvfs"
+        )
+        self._pending = {}
+
+    async def usage(self, timeout: float):
+        """Список {"mountpoint", "usage", "error"}; error — "timeout" или текст ошибки."""
+        mounts = self.mount_table.mounts()
+        futures = {}
+
+        for mountpoint in mounts:
+            future = self._pending.get(mountpoint)
+            if future is None or future.done():
+                future = self._executor.submit(psutil.disk_usage, mountpoint)
+                self._pending[mountpoint] = future
+            futures[mountpoint] = future
+
+        for mountpoint in set(self._pending) - set(futures):
+            if self._pending[mountpoint].done():
+                del self._pending[mountpoint]
+
+        if futures:
+            await asyncio.wait(
+                [asyncio.wrap_future(f) for f in futures.values()], timeout=timeout
+            )
+
+        result = []
+        for mountpoint, future in futures.items():
+            entry = {"mountpoint": mountpoint, "usage": None, "error": None}
+            if not future.done():
+                logger.warning(f"⏳ statvfs {mountpoint} не ответил за {timeout}с")
+                entry["error"] = "timeout"
+            elif isinstance(future.exception(), PermissionError):
+                continue
+            elif future.exception():
+                entry["error"] = str(future.exception())
+            else:
+                entry["usage"] = future.result()
+            result.append(entry)
+
+        return result
+
+
+disk_probe = DiskProbe(MountTable())
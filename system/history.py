@@ -0,0 +1,104 @@
+import math
+import time
+import logging
+from array import array
+
+from config import HISTORY
+
+logger = logging.getLogger(__name__)
+
+METRICS = ("cpu", "ram", "temp")
+
+# Имя, охват (сек) и число точек. Шаг уровня — охват / точки, но не меньше
+# интервала сбора: 1ч по 10с, 24ч по 4мин, 7д по 28мин.
+TIERS = (("1h", 3600, 360), ("24h", 86400, 360), ("7d", 604800, 360))
+
+
+class RingTier:
+    """
+    Кольцевой буфер одного уровня детализации: фиксированное число слотов,
+    в каждом — среднее значение метрик за шаг. Значения хранятся в array('f'),
+    время начала шага — в array('d'), так что память не растёт с аптаймом.
+    """
+
+    def __init__(self, name: str, span: int, points: int, min_step: int, metrics):
+        self.name = name
+        self.span = span
+        self.step = max(span // points, min_step)
+        self.capacity = math.ceil(span / self.step)
+        self.times = array("d", [0.0] * self.capacity)
+        self.values = {m: array("f", [math.nan] * self.capacity) for m in metrics}
+        self.head = 0
+        self.count = 0
+        self._bucket = None
+        self._sums = dict.fromkeys(metrics, 0.0)
+        self._counts = dict.fromkeys(metrics, 0)
+
+    def add(self, ts: float, sample: dict):
+        bucket = ts - ts % self.step
+        if self._bucket is not None and bucket != self._bucket:
+            self._flush()
+        self._bucket = bucket
+
+        for metric, value in sample.items():
+            if value is None or metric not in self._sums:
+                continue
+            self._sums[metric] += value
+            self._counts[metric] += 1
+
+    def _flush(self):
+        self.times[self.head] = self._bucket
+        for metric, values in self.values.items():
+            count = self._counts[metric]
+            values[self.head] = self._sums[metric] / count if count else math.nan
+            self._sums[metric] = 0.0
+            self._counts[metric] = 0
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def points(self, metric: str, now: float | None = None):
+        """Точки (время, значение) за охват уровня, от старых к новым."""
+        now = time.time() if now is None else now
+        since = now - self.span
+        values = self.values[metric]
+
+        result = []
+        start = (self.head - self.count) % self.capacity
+        for i in range(self.count):
+            slot = (start + i) % self.capacity
+            value = values[slot]
+            if self.times[slot] >= since and not math.isnan(value):
+                result.append((self.times[slot], value))
+
+        if self._bucket is not None and self._counts[metric]:
+            result.append((self._bucket, self._sums[metric] / self._counts[metric]))
+        return result
+
+
+class MetricsHistory:
+    """История метрик хоста: один замер пишется сразу во все уровни."""
+
+    def __init__(self, min_step: int = 1, metrics=METRICS, tiers=TIERS):
+        self.tiers = {
+            name: RingTier(name, span, points, min_step, metrics)
+            for name, span, points in tiers
+        }
+
+    def add(self, sample: dict, ts: float | None = None):
+        ts = time.time() if ts is None else ts
+        for tier in self.tiers.values():
+            tier.add(ts, sample)
+
+    def points(self, tier: str, metric: str, now: float | None = None):
+        return self.tiers[tier].points(metric, now)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            tier.times.itemsize * len(tier.times)
+            + sum(v.itemsize * len(v) for v in tier.values.values())
+            for tier in self.tiers.values()
+        )
+
+
+host_history = MetricsHistory(HISTORY.sample_interval)
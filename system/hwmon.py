@@ -0,0 +1,135 @@
+import errno
+import os
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+HWMON_ROOT = "/sys/class/hwmon"
+REDISCOVER_INTERVAL = 300
+_GONE_ERRNOS = {errno.ENODEV, errno.ENOENT, errno.ENXIO, errno.EBADF}
+
+
+def classify_sensor(label: str, chip: str) -> str:
+    """Понятное имя датчика по метке и имени чипа."""
+    label_lower = label.lower()
+    chip_lower = chip.lower()
+
+    if "tctl" in label_lower or "tctl" in chip_lower:
+        return "CPU"
+    if "ccd" in label_lower or "ccd" in chip_lower:
+        return "CPU (Кристалл)"
+    if "mt7921" in label_lower or "mt7921" in chip_lower:
+        return "Wi-Fi адаптер"
+    return label
+
+
+def _read_text(path: str) -> str:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+class HwmonReader:
+    """
+    Температуры напрямую из sysfs hwmon.
+
+    Каталоги, метки и их классификация разбираются один раз при обнаружении
+    (и заново раз в rediscover секунд или если датчик пропал). Замер — это
+    только pread() уже открытых temp*_input, без обхода дерева.
+    """
+
+    def __init__(self, root: str = HWMON_ROOT, rediscover: int = REDISCOVER_INTERVAL):
+        self.root = root
+        self.rediscover = rediscover
+        self._lock = threading.Lock()
+        # (fd, путь, чип, имя датчика)
+        self._inputs = []
+        self._discovered_at = None
+
+    @property
+    def available(self) -> bool:
+        return os.path.isdir(self.root)
+
+    def discover(self):
+        self._close()
+        inputs = []
+
+        try:
+            devices = sorted(os.listdir(self.root))
+        except OSError as e:
+            logger.debug(f"hwmon недоступен ({self.root}): {e}")
+            devices = []
+
+        for device in devices:
+            path = os.path.join(self.root, device)
+            chip = _read_text(os.path.join(path, "name")) or device
+            try:
+                files = sorted(os.listdir(path))
+            except OSError:
+                continue
+
+            for name in files:
+                if not (name.startswith("temp") and name.endswith("_input")):
+                    continue
+                prefix = name[: -len("_input")]
+                label = _read_text(os.path.join(path, f"{prefix}_label")) or chip
+                input_path = os.path.join(path, name)
+                try:
+                    fd = os.open(input_path, os.O_RDONLY)
+                except OSError:
+                    continue
+                inputs.append((fd, input_path, chip, classify_sensor(label, chip)))
+
+        self._inputs = inputs
+        self._discovered_at = time.monotonic()
+        logger.debug(f"hwmon: найдено датчиков температуры: {len(inputs)}")
+
+    def read(self):
+        """Список {"chip", "sensor", "temp"} в том же виде, что и get_temp()."""
+        with self._lock:
+            if (
+                self._discovered_at is None
+                or time.monotonic() - self._discovered_at >= self.rediscover
+            ):
+                self.discover()
+
+            temps = []
+            lost = False
+            for fd, path, chip, sensor in self._inputs:
+                try:
+                    raw = os.pread(fd, 32, 0)
+                    temps.append(
+                        {"chip": chip, "sensor": sensor, "temp": int(raw) / 1000}
+                    )
+                except ValueError:
+                    continue
+                except OSError as e:
+                    # ENODATA/EIO бывают у спящих устройств: просто пропускаем замер.
+                    # Устройство отключили — перечитаем дерево в следующий раз
+                    if e.errno in _GONE_ERRNOS:
+                        lost = True
+                    logger.debug(f"hwmon: не удалось прочитать {path}: {e}")
+
+            if lost:
+                self._discovered_at = None
+            return temps
+
+    def close(self):
+        with self._lock:
+            self._close()
+            self._discovered_at = None
+
+    def _close(self):
+        for fd, *_ in self._inputs:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        self._inputs = []
+
+
+hwmon_reader = HwmonReader()
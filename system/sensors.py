@@ -3,13 +3,21 @@ import time
 import logging
 from datetime import timedelta
 
-logger = logging.getLogger(__name__)
+from system.hwmon import classify_sensor, hwmon_reader
 
-IGNORE_FSTYPES = {"", "squashfs", "tmpfs", "devtmpfs", "overlay", "iso9660", "vfat"}
+logger = logging.getLogger(__name__)
 
 
 def get_temp():
-    """Собирает температуры и возвращает список словарей (для алертов и статуса)."""
+    """
+    Собирает температуры и возвращает список словарей (для алертов и статуса).
+    На Linux читает hwmon напрямую, иначе — через psutil.
+    """
+    if hwmon_reader.available:
+        temps = hwmon_reader.read()
+        if temps:
+            return temps
+
     temps_list = []
     if not hasattr(psutil, "sensors_temperatures"):
         return temps_list
@@ -19,21 +27,13 @@ def get_temp():
         for chip_name, entries in temps.items():
             for entry in entries:
                 label = entry.label or chip_name
-                val = entry.current
-
-                label_lower = label.lower()
-                chip_lower = chip_name.lower()
-
-                if "tctl" in label_lower or "tctl" in chip_lower:
-                    pretty = "CPU"
-                elif "ccd" in label_lower or "ccd" in chip_lower:
-                    pretty = "CPU (Кристалл)"
-                elif "mt7921" in label_lower or "mt7921" in chip_lower:
-                    pretty = "Wi-Fi адаптер"
-                else:
-                    pretty = label
-
-                temps_list.append({"chip": chip_name, "sensor": pretty, "temp": val})
+                temps_list.append(
+                    {
+                        "chip": chip_name,
+                        "sensor": classify_sensor(label, chip_name),
+                        "temp": entry.current,
+                    }
+                )
 
         return temps_list
     except Exception as e:
@@ -41,6 +41,17 @@ def get_temp():
         return []
 
 
+def pick_cpu_temp(temps):
+    """Температура CPU из списка get_temp() (или максимальная), None если датчиков нет."""
+    if not temps:
+        return None
+
+    cpu_temp = next((t["temp"] for t in temps if t["sensor"] == "CPU"), None)
+    if cpu_temp is None:
+        cpu_temp = max(t["temp"] for t in temps)
+    return cpu_temp
+
+
 def get_uptime_str():
     """Возвращает время работы системы в удобном формате."""
     uptime_seconds = time.time() - psutil.boot_time()
@@ -49,50 +60,55 @@ def get_uptime_str():
     return f"{td.days}д {hours}ч"
 
 
-def get_cpu_load():
-    """Получает нагрузку на CPU (кроссплатформенно)."""
-    try:
-        load = psutil.getloadavg()
-        cpus = psutil.cpu_count(logical=True) or 1
+def format_cpu_load(sample: dict) -> str:
+    """Загрузка CPU из замера коллектора и load average, если он есть."""
+    text = f"{sample['cpu']}%"
+    if not sample.get("load"):
+        return text
+
+    cpus = psutil.cpu_count(logical=True) or 1
 
-        def load_pct(l):
-            pct = int((l / cpus) * 100)
-            return f"{l:.2f} ({pct}%)"
+    def load_pct(l):
+        pct = int((l / cpus) * 100)
+        return f"{l:.2f} ({pct}%)"
 
-        return f"1м: {load_pct(load[0])}, 5м: {load_pct(load[1])}, 15м: {load_pct(load[2])}"
-    except AttributeError:
-        return f"{psutil.cpu_percent(interval=1)}%"
+    load = sample["load"]
+    return (
+        f"{text}, LA 1м: {load_pct(load[0])}, 5м: {load_pct(load[1])}, "
+        f"15м: {load_pct(load[2])}"
+    )
 
 
-def get_status():
-    """Собирает всю информацию о системе и формирует итоговый текст."""
+def get_status(sample: dict, disks: list):
+    """Формирует итоговый текст по замеру коллектора (CPU, RAM, датчики) и дискам."""
     try:
         uptime = get_uptime_str()
-        cpu_load = get_cpu_load()
+        cpu_load = format_cpu_load(sample)
 
-        ram = psutil.virtual_memory()
-        ram_used_gb = int(ram.used / (1024**3))
-        ram_total_gb = int(ram.total / (1024**3))
-        ram_usage = f"{int(ram.percent)}% ({ram_used_gb}ГБ / {ram_total_gb}ГБ)"
+        ram_used_gb = int(sample["ram_used"] / (1024**3))
+        ram_total_gb = int(sample["ram_total"] / (1024**3))
+        ram_usage = f"{int(sample['ram'])}% ({ram_used_gb}ГБ / {ram_total_gb}ГБ)"
 
         disks_out = []
-        for part in psutil.disk_partitions(all=False):
-            if part.fstype in IGNORE_FSTYPES or part.mountpoint.startswith("/boot"):
-                continue
-
-            try:
-                usage = psutil.disk_usage(part.mountpoint)
-                used_gb = round(usage.used / (1024**3), 1)
-                size_gb = round(usage.total / (1024**3), 1)
+        for disk in disks:
+            mountpoint = disk["mountpoint"]
+            emoji = "🖥️" if mountpoint in ("/", "C:\\") else "🗄️"
 
-                emoji = "🖥️" if part.mountpoint in ("/", "C:\\") else "🗄️"
-                disks_out.append(
-                    f"{emoji} {part.mountpoint}: {usage.percent}% ({used_gb}ГБ / {size_gb}ГБ)"
-                )
-            except PermissionError:
+            if disk["error"] == "timeout":
+                disks_out.append(f"{emoji} {mountpoint}: ⏳ timeout")
+                continue
+            if disk["error"]:
+                disks_out.append(f"{emoji} {mountpoint}: ❌ {disk['error']}")
                 continue
 
-        temps = get_temp()
+            usage = disk["usage"]
+            used_gb = round(usage.used / (1024**3), 1)
+            size_gb = round(usage.total / (1024**3), 1)
+            disks_out.append(
+                f"{emoji} {mountpoint}: {usage.percent}% ({used_gb}ГБ / {size_gb}ГБ)"
+            )
+
+        temps = sample["temps"]
         temps_text = []
         if not temps:
             if not hasattr(psutil, "sensors_temperatures"):
@@ -129,4 +145,9 @@ def get_status():
 
 
 if __name__ == "__main__":
-    print(get_status())
+    import asyncio
+    from system.collector import host_collector
+    from system.disks import disk_probe
+
+    disks = asyncio.run(disk_probe.usage(timeout=2))
+    print(get_status(host_collector.sample(), disks))